@@ -444,33 +444,41 @@ class Database:
         self.stock_data = None
         self.failure_data = None
         self.success_data = None
+        # Header of every file as of its latest load, so saving does not read the file again
+        self.columns = {}
 
     def load_stock_data(self, reset=False):
         if reset or self.stock_data is None:
             self.stock_data = pd.read_csv(self.stock_file, sep=';').fillna(0)
+            self.columns[self.stock_file] = self.stock_data.columns
         return self.stock_data
 
     def load_failure_rates(self):
         if self.failure_data is None:
             self.failure_data = pd.read_csv(self.failure_file, sep=';').fillna(0)
+            self.columns[self.failure_file] = self.failure_data.columns
         return self.failure_data
 
     def load_success_rates(self):
         if self.success_data is None:
             self.success_data = pd.read_csv(self.success_file, sep=';').fillna(0)
+            self.columns[self.success_file] = self.success_data.columns
         return self.success_data
 
+    def original_columns(self, file_path):
+        """Returns the header columns of file_path, read once."""
+        if file_path not in self.columns:
+            self.columns[file_path] = pd.read_csv(file_path, sep=';', nrows=0).columns
+        return self.columns[file_path]
+
     def save_stock_data(self, stock_data, output_file):
-        original_columns = pd.read_csv(self.stock_file, sep=';', nrows=1).columns
-        stock_data[original_columns].to_csv(output_file, sep=';', index=False)
+        stock_data[self.original_columns(self.stock_file)].to_csv(output_file, sep=';', index=False)
 
     def save_failure_data(self, failure_data, output_file):
-        original_columns = pd.read_csv(self.failure_file, sep=';', nrows=1).columns
-        failure_data[original_columns].to_csv(output_file, sep=';', index=False)
+        failure_data[self.original_columns(self.failure_file)].to_csv(output_file, sep=';', index=False)
 
     def save_success_data(self, success_data, output_file):
-        original_columns = pd.read_csv(self.success_file, sep=';', nrows=1).columns
-        success_data[original_columns].to_csv(output_file, sep=';', index=False)
+        success_data[self.original_columns(self.success_file)].to_csv(output_file, sep=';', index=False)
 
     def reset_data(self):
         self.stock_data = None
@@ -0,0 +1,103 @@
+import argparse
+import sys
+
+from models.csv_reader import ENGINES
+from models.database import Database
+from controllers.result_cache import ResultCache
+from controllers.stock_manager import StockManager
+from utils.instrumentation import recorder
+
+
+def parse_args(argv):
+    """Parses the command line of the headless projection run."""
+    parser = argparse.ArgumentParser(description="Project stock levels from semicolon separated CSV files.")
+    parser.add_argument('stock_file', help="CSV file with the stock data")
+    parser.add_argument('failure_file', help="CSV file with the failure rates")
+    parser.add_argument('success_file', help="CSV file with the success rates")
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int)
+    parser.add_argument('output_file', help="file the updated stock data is written to; "
+                                            "Parquet or Feather for .parquet or .feather files, CSV otherwise")
+    parser.add_argument('--plot', metavar='IMAGE_FILE',
+                        help="also save the value change chart to this file (format taken from the extension)")
+    parser.add_argument('--top-n', type=int,
+                        help="chart only the N largest groups as their own series and the rest as \"Other\"")
+    parser.add_argument('--fast-chart', action='store_true',
+                        help="draw the chart bars as one collection per year instead of one series per source")
+    parser.add_argument('--group-by', default='Source', help="column the chart series are grouped by")
+    parser.add_argument('--mode', choices=StockManager.MODES, default='stepwise', help="projection engine")
+    parser.add_argument('--key', metavar='COLUMN',
+                        help="pair stock and rate rows by this part ID column (like Source) instead of by position")
+    parser.add_argument('--workers', type=int, help="processes used by the parallel mode (default: all cores)")
+    parser.add_argument('--cache-dir', help="reuse projections and chart data of identical earlier runs from here")
+    parser.add_argument('--chunk-size', type=int,
+                        help="stream the CSV files, reading, projecting and writing this many rows at a time")
+    parser.add_argument('--compact', action='store_true',
+                        help="keep the tables in narrow column types (same results, less memory)")
+    parser.add_argument('--csv-engine', choices=ENGINES, default='pandas',
+                        help="CSV parser of whole files; pyarrow reads on all cores and gives the same tables")
+    parser.add_argument('--decimal', choices=('.', ','), default='.',
+                        help="decimal separator of the input and output CSV files")
+    parser.add_argument('--trace', metavar='JSON_FILE', help="save the timings of every step as a Chrome trace")
+    parser.add_argument('--storage-dir',
+                        help="keep the year columns in memory-mapped files in this directory")
+    args = parser.parse_args(argv)
+    if args.plot and (args.chunk_size or args.storage_dir):
+        parser.error("--plot needs the whole projection in memory and cannot be combined with "
+                     "--chunk-size or --storage-dir")
+    if args.key and (args.chunk_size or args.storage_dir):
+        parser.error("--key needs the whole tables in memory and cannot be combined with --chunk-size or --storage-dir")
+    if args.chunk_size and args.storage_dir:
+        parser.error("--chunk-size and --storage-dir cannot be combined")
+    if args.chunk_size and (args.compact or args.csv_engine != 'pandas' or args.cache_dir):
+        parser.error("--chunk-size streams the CSV files with pandas and cannot be combined with "
+                     "--compact, --csv-engine or --cache-dir")
+    return args
+
+
+def main(argv=None):
+    """Projects the input CSV files into the output CSV file, without any GUI."""
+    args = parse_args(argv)
+    if args.chunk_size:
+        stock_manager = StockManager(Database(decimal=args.decimal))
+        rows = stock_manager.stream_stock(args.stock_file, args.failure_file, args.success_file, args.output_file,
+                                          args.start_year, args.end_year, chunk_size=args.chunk_size,
+                                          mode=args.mode, workers=args.workers)
+        print(f"Projected {rows} rows into {args.output_file}")
+        save_trace(args.trace)
+        return 0
+
+    cache = ResultCache(directory=args.cache_dir) if args.cache_dir else None
+    database = Database(storage_dir=args.storage_dir, compact=args.compact, csv_engine=args.csv_engine,
+                        decimal=args.decimal)
+    database.load_stock_data(args.stock_file)
+    database.load_failure_rates(args.failure_file)
+    database.load_success_rates(args.success_file)
+    stock_data = StockManager(database, cache, args.key).update_stock(args.start_year, args.end_year, mode=args.mode,
+                                                               workers=args.workers)
+    database.save_stock_data(stock_data, args.output_file)
+    print(f"Projected {len(stock_data)} rows into {args.output_file}")
+
+    if args.plot:
+        from controllers.plotter import Plotter  # matplotlib is only imported when a chart is wanted
+        plotter = Plotter(database, cache)
+        if args.fast_chart:
+            fig = plotter.draw_value_change(plotter.value_change_data(args.start_year, args.end_year,
+                                                                      top_n=args.top_n, key=args.group_by))
+        else:
+            fig = plotter.plot_value_change(args.start_year, args.end_year, top_n=args.top_n, key=args.group_by)
+        fig.savefig(args.plot)
+        print(f"Chart saved to {args.plot}")
+    save_trace(args.trace)
+    return 0
+
+
+def save_trace(file_path):
+    """Writes the recorded timings to file_path as a Chrome trace, when one was asked for."""
+    if file_path:
+        recorder.export_chrome_trace(file_path)
+        print(f"Timings saved to {file_path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
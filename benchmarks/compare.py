@@ -0,0 +1,60 @@
+"""Compares two benchmark result files written by benchmarks.suite.
+
+Run from the repository root:  python -m benchmarks.compare OLD.json NEW.json [--threshold 1.2]
+Exits with status 1 when a benchmark's median time grew by more than the threshold factor;
+benchmarks faster than --min-seconds are reported but never count, their timings are mostly noise.
+"""
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 1.2
+DEFAULT_MIN_SECONDS = 0.01
+
+
+def load_results(file_path):
+    """Reads a result file and returns its environment and results keyed on (benchmark, rows)."""
+    with open(file_path) as result_file:
+        report = json.load(result_file)
+    return report, {(result['benchmark'], result['rows']): result for result in report['results']}
+
+
+def compare(old_results, new_results, threshold=DEFAULT_THRESHOLD, min_seconds=DEFAULT_MIN_SECONDS):
+    """Returns (benchmark, rows, old, new, time ratio, memory ratio, regressed) for benchmarks in both files."""
+    rows = []
+    for key in sorted(old_results.keys() & new_results.keys(), key=lambda key: (key[1], key[0])):
+        old, new = old_results[key], new_results[key]
+        time_ratio = new['median_seconds'] / old['median_seconds'] if old['median_seconds'] else float('inf')
+        memory_ratio = (new['peak_memory_bytes'] / old['peak_memory_bytes']
+                        if old['peak_memory_bytes'] else float('inf'))
+        rows.append((*key, old, new, time_ratio, memory_ratio,
+                     time_ratio > threshold and new['median_seconds'] >= min_seconds))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('old_file')
+    parser.add_argument('new_file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="median time ratio above which a benchmark counts as a regression")
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help="median time below which a slower benchmark is not a regression")
+    args = parser.parse_args(argv)
+
+    old_report, old_results = load_results(args.old_file)
+    new_report, new_results = load_results(args.new_file)
+    print(f"old: {old_report.get('commit')}  new: {new_report.get('commit')}")
+    regressions = 0
+    comparison = compare(old_results, new_results, args.threshold, args.min_seconds)
+    for benchmark, rows, old, new, time_ratio, memory_ratio, regressed in comparison:
+        regressions += regressed
+        print(f"{benchmark:>22} {rows:>8} rows: {old['median_seconds']:.4f}s -> {new['median_seconds']:.4f}s "
+              f"(x{time_ratio:.2f}), memory x{memory_ratio:.2f}{'  REGRESSION' if regressed else ''}")
+    for benchmark, rows in sorted(old_results.keys() ^ new_results.keys()):
+        print(f"{benchmark:>22} {rows:>8} rows: only in {'old' if (benchmark, rows) in old_results else 'new'} results")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
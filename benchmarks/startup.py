@@ -0,0 +1,56 @@
+"""Cold start benchmark: time from launching the desktop app until its window is shown.
+
+Run from the repository root:  python -m benchmarks.startup [--budget SECONDS]
+Exits with status 1 when the median start time exceeds the budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = 0.5  # seconds; Qt only, pandas and matplotlib load after the window shows
+
+CHILD = """
+import sys
+sys.path.insert(0, {root!r})
+from PyQt5.QtWidgets import QApplication
+import main
+app = QApplication(sys.argv)
+window = main.App(offer_restore=False)  # A modal restore question would hang the run
+app.processEvents()
+print('shown', flush=True)
+"""
+
+
+def measure_startup(platform='offscreen'):
+    """Starts the app in a fresh interpreter and returns the seconds until its window is shown."""
+    env = dict(os.environ, QT_QPA_PLATFORM=platform)
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-c', CHILD.format(root=ROOT)], cwd=ROOT, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = child.stdout.readline()
+    elapsed = time.perf_counter() - start
+    child.communicate()
+    if line.strip() != 'shown':
+        raise RuntimeError(f"The app did not start (exit status {child.returncode}).")
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the desktop app's cold start time against a budget.")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="allowed median start time in seconds")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--platform', default='offscreen', help="Qt platform plugin used for the window")
+    args = parser.parse_args(argv)
+
+    timings = [measure_startup(args.platform) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"startup: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s, budget {args.budget:.3f}s")
+    return 0 if median <= args.budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Benchmarks of loading, projection, charting, saving and table display on synthetic datasets.
+
+Run from the repository root:  python -m benchmarks.suite --output results.json [--sizes 1000 10000]
+Each benchmark is timed --repeat times and run once more under tracemalloc for its peak
+memory. Compare the JSON files of two commits with  python -m benchmarks.compare.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import END_YEAR, START_YEAR, write_dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def measure(function, repeat):
+    """Returns the timings of repeat calls of function and the peak traced memory of one more call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return timings, peak
+
+
+def table_window():
+    """Returns the app window, shown on an offscreen screen unless QT_QPA_PLATFORM says otherwise."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    import main
+    application = QApplication.instance() or QApplication(sys.argv)
+    window = main.App(offer_restore=False)  # A modal restore question would hang the run
+    window.show()
+    return application, window
+
+
+def run_size(rows, data_dir, repeat, top_n, mode, gui, csv_engine='pandas'):
+    """Benchmarks every step of the app on the dataset of the given size and returns the results."""
+    from controllers.plotter import Plotter
+    from controllers.stock_manager import StockManager
+    from models.database import Database
+
+    stock_file, failure_file, success_file = write_dataset(data_dir, rows)
+    database = Database(use_cache=False, csv_engine=csv_engine)  # Times the CSV parsing, not the table cache
+    stock_manager = StockManager(database)
+    plotter = Plotter(database)
+    benchmarks = [
+        ('load_stock_data', lambda: database.load_stock_data(stock_file)),
+        ('load_failure_rates', lambda: database.load_failure_rates(failure_file)),
+        ('load_success_rates', lambda: database.load_success_rates(success_file)),
+        ('update_stock', lambda: stock_manager.update_stock(START_YEAR, END_YEAR, mode=mode)),
+        ('plot_value_change', lambda: plotter.plot_value_change(START_YEAR, END_YEAR, top_n=top_n or None)),
+        ('save_stock_data', lambda: database.save_stock_data(database.stock_data_changed,
+                                                             os.path.join(data_dir, f'updated_{rows}.csv'))),
+    ]
+    if gui:
+        application, window = table_window()
+
+        def display_table():
+            window.display_data_in_table(database.stock_data_changed, window.changed_table_stock)
+            application.processEvents()
+
+        benchmarks.append(('display_data_in_table', display_table))
+
+    results = []
+    for name, function in benchmarks:
+        timings, peak = measure(function, repeat)
+        results.append({'benchmark': name, 'rows': rows, 'median_seconds': statistics.median(timings),
+                        'min_seconds': min(timings), 'runs': len(timings), 'peak_memory_bytes': peak})
+        print(f"{name:>22} {rows:>8} rows: median {results[-1]['median_seconds']:.4f}s, "
+              f"peak {peak / 1024 ** 2:.1f} MB", flush=True)
+    return results
+
+
+def environment():
+    """Describes the commit and package versions the benchmarks ran on."""
+    import matplotlib
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'packages': {'numpy': numpy.__version__, 'pandas': pandas.__version__,
+                         'matplotlib': matplotlib.__version__}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark loading, projection, charting and table display.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="rows per dataset")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file the results are written to")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'stock_benchmarks'),
+                        help="directory the synthetic CSV files are written to and reused from")
+    parser.add_argument('--top-n', type=int, default=20, help="sources charted by plot_value_change (0 = all)")
+    parser.add_argument('--mode', default='stepwise', help="projection engine timed by update_stock")
+    parser.add_argument('--csv-engine', default='pandas', help="CSV parser timed by the load benchmarks")
+    parser.add_argument('--no-gui', action='store_true', help="skip the table display benchmark")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.sizes:
+        results.extend(run_size(rows, args.data_dir, args.repeat, args.top_n, args.mode, not args.no_gui,
+                                args.csv_engine))
+    report = dict(environment(), settings={'repeat': args.repeat, 'top_n': args.top_n, 'mode': args.mode,
+                                           'csv_engine': args.csv_engine},
+                  results=results)
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Synthetic stock, failure and success CSV files in the layout the app loads.
+
+Run from the repository root:  python -m benchmarks.synthetic DIRECTORY --rows 100000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+START_YEAR = 2024
+END_YEAR = 2040
+ADDITION_YEARS = (2024, 2026, 2030)  # Stock columns with parts added in later years
+
+
+def make_tables(rows, seed=0, start_year=START_YEAR, end_year=END_YEAR):
+    """Returns random (stock, failure, success) DataFrames with rows parts each.
+
+    Every tenth part shares a Source, some stock additions are missing and a fifth of
+    the rates are 0, like the real files.
+    """
+    rng = np.random.default_rng(seed)
+    sources = pd.Series([f'Source {i}' for i in rng.integers(0, max(rows // 10, 1), rows)])
+    stock = pd.DataFrame({'Source': sources, '2023': rng.integers(0, 1000, rows)})
+    for year in ADDITION_YEARS:
+        additions = rng.integers(0, 50, rows).astype(float)
+        additions[rng.random(rows) < 0.05] = np.nan
+        stock[str(year)] = additions
+
+    failure = pd.DataFrame({'Source': sources})
+    success = pd.DataFrame({'Source': sources})
+    for year in range(start_year, end_year + 1):
+        failure[str(year)] = np.where(rng.random(rows) < 0.2, 0, rng.uniform(0, 30, rows).round(2))
+        success[str(year)] = np.where(rng.random(rows) < 0.2, 0, rng.uniform(0, 100, rows).round(2))
+    return stock, failure, success
+
+
+def write_dataset(directory, rows, seed=0, start_year=START_YEAR, end_year=END_YEAR):
+    """Writes the stock, failure and success CSV files for rows parts, unless they exist already.
+
+    Returns the three file paths; the file names carry the row count and seed, so datasets
+    of several sizes can share a directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f'{name}_{rows}_{seed}.csv') for name in ('stock', 'failure', 'success')]
+    if not all(os.path.exists(path) for path in paths):
+        for table, path in zip(make_tables(rows, seed, start_year, end_year), paths):
+            table.to_csv(path, sep=';', index=False)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic stock, failure and success CSV files.")
+    parser.add_argument('directory')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000], help="parts per dataset, one dataset each")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for rows in args.rows:
+        print(*write_dataset(args.directory, rows, args.seed), sep='\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Lets pytest import the app's models, controllers and views packages from the repository root."""
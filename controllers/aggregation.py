@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from models.compact import float_values
+
+OTHER_LABEL = 'Other'
+
+
+def top_contributors(stock_data, years, key='Source', top_n=20, other_label=OTHER_LABEL):
+    """Sums the year columns per key and keeps the top_n groups with the largest total.
+
+    All remaining groups, and rows without a key, are summed into one other_label row, so
+    the result has at most top_n + 1 rows whatever the size of stock_data. Kept groups
+    stay in the order they first appear; non-finite values count as 0.
+    """
+    codes, groups = pd.factorize(stock_data[key])
+    values = float_values(stock_data, years)
+    values[~np.isfinite(values)] = 0
+
+    known = codes >= 0
+    sums = np.zeros((len(groups), len(years)))
+    np.add.at(sums, codes[known], values[known])
+    kept = np.sort(np.argsort(-sums.sum(axis=1), kind='stable')[:top_n])
+
+    aggregated = pd.DataFrame(sums[kept], columns=years)
+    aggregated.insert(0, key, groups[kept].astype(str))
+    if len(kept) < len(groups) or not known.all():
+        other = values.sum(axis=0) - sums[kept].sum(axis=0)
+        aggregated.loc[len(aggregated)] = [other_label, *other]
+    return aggregated
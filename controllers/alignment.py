@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+
+class RowAlignment:
+    """Pairs stock rows with the failure and success rows holding their rates.
+
+    stock_rows, failure_rows and success_rows select the paired rows of each table in
+    the same order, as slices when the tables are paired by position and as position
+    arrays when they are joined on a key. Rows without a partner in every table are
+    listed in the unmatched_* arrays; their stock is left unprojected.
+    """
+
+    def __init__(self, stock_rows, failure_rows, success_rows, unmatched_stock, unmatched_failure,
+                 unmatched_success, key=None):
+        self.stock_rows = stock_rows
+        self.failure_rows = failure_rows
+        self.success_rows = success_rows
+        self.unmatched_stock = unmatched_stock
+        self.unmatched_failure = unmatched_failure
+        self.unmatched_success = unmatched_success
+        self.key = key
+
+    @classmethod
+    def by_position(cls, stock_length, failure_length, success_length):
+        """Pairs the n-th rows of the tables, as long as all three have one."""
+        rows = min(stock_length, failure_length, success_length)
+        return cls(slice(0, rows), slice(0, rows), slice(0, rows), np.arange(rows, stock_length),
+                   np.arange(rows, failure_length), np.arange(rows, success_length))
+
+    @classmethod
+    def by_key(cls, stock_data, failure_data, success_data, key='Source'):
+        """Joins the tables on the key column with hash lookups, in O(rows).
+
+        A key repeated in a table pairs its n-th stock row with its n-th failure and success
+        rows, so tables listing several parts per Source still line up in their own order.
+        Rows without a key are never paired and are listed as unmatched; loaded tables have
+        their empty cells filled with 0, so a key of 0 or '' counts as missing too.
+        """
+        tables = (stock_data, failure_data, success_data)
+        for name, table in zip(('stock', 'failure', 'success'), tables):
+            if key not in table.columns:
+                raise ValueError(f"The {name} data has no '{key}' column to match rows on.")
+        keys = np.concatenate([table[key].to_numpy(dtype=object) for table in tables])
+        codes = pd.factorize(keys)[0]
+        codes[missing_keys(keys)] = -1
+        stock_keys, failure_keys, success_keys = [
+            occurrence_keys(table_codes, len(codes) + 1)
+            for table_codes in np.split(codes, np.cumsum([len(table) for table in tables[:-1]]))]
+        failure_match = pd.Index(failure_keys).get_indexer(stock_keys)
+        success_match = pd.Index(success_keys).get_indexer(stock_keys)
+        matched = (stock_keys >= 0) & (failure_match >= 0) & (success_match >= 0)
+        failure_rows, success_rows = failure_match[matched], success_match[matched]
+        return cls(np.flatnonzero(matched), failure_rows, success_rows, np.flatnonzero(~matched),
+                   unused_rows(failure_rows, len(failure_data)), unused_rows(success_rows, len(success_data)), key)
+
+    @property
+    def complete(self):
+        """True when every row of every table found its partners."""
+        return not (len(self.unmatched_stock) or len(self.unmatched_failure) or len(self.unmatched_success))
+
+    def describe(self, stock_data, failure_data, success_data, limit=10):
+        """Lists the unmatched rows of each table by their key, or their 1-based row numbers without one."""
+        lines = []
+        for name, table, rows, partner in ((
+                'stock', stock_data, self.unmatched_stock, 'failure or success rates'),
+                ('failure', failure_data, self.unmatched_failure, 'a match in the other tables'),
+                ('success', success_data, self.unmatched_success, 'a match in the other tables')):
+            if len(rows):
+                if self.key:
+                    keys = table[self.key].iloc[rows[:limit]].to_numpy(dtype=object)
+                    labels = np.where(missing_keys(keys), '(no key)', keys.astype(str))
+                else:
+                    labels = (rows[:limit] + 1).astype(str)
+                more = f" and {len(rows) - limit} more" if len(rows) > limit else ""
+                lines.append(f"{len(rows)} {name} rows without {partner}: {', '.join(labels)}{more}")
+        return '\n'.join(lines)
+
+
+def missing_keys(keys):
+    """Tells which keys are missing: NaN, or the 0 or '' an empty cell was filled with."""
+    return pd.isna(keys) | (keys == 0) | (keys == '')
+
+
+def occurrence_keys(codes, stride):
+    """Combines every key code with its occurrence number (below stride) into one int64 key per row.
+
+    Missing keys (code -1) get distinct negative keys, which by_key never matches.
+    """
+    occurrences = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    combined = codes.astype(np.int64) * stride + occurrences
+    combined[codes < 0] = -1 - np.arange((codes < 0).sum())
+    return combined
+
+
+def unused_rows(rows, length):
+    """Returns the positions below length that are not in rows."""
+    used = np.zeros(length, dtype=bool)
+    used[rows] = True
+    return np.flatnonzero(~used)
@@ -0,0 +1,95 @@
+import numpy as np
+
+from controllers import projection
+
+PART_BLOCK = 256  # Parts drawn from one generator, the unit simulate() chunks by
+
+
+class RateDistribution:
+    """Distribution of a sampled rate around its CSV value.
+
+    kind is 'normal', 'lognormal', 'uniform' or 'triangular'. spread is relative to the CSV
+    value: the standard deviation for normal and lognormal, the half width for uniform and
+    triangular. Samples are clipped to 0..100 percent, and rates of 0 are never sampled away.
+    """
+
+    KINDS = ('normal', 'lognormal', 'uniform', 'triangular')
+
+    def __init__(self, kind='normal', spread=0.1):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown rate distribution '{kind}', expected one of {', '.join(self.KINDS)}.")
+        self.kind = kind
+        self.spread = spread
+
+    def sample(self, rng, rates, samples):
+        """Draws (samples x parts) rates centered on the given rates of the parts."""
+        size = (samples,) + np.shape(rates)
+        if self.kind == 'normal':
+            factors = 1 + self.spread * rng.standard_normal(size)
+        elif self.kind == 'lognormal':
+            factors = np.exp(self.spread * rng.standard_normal(size) - self.spread ** 2 / 2)  # Mean 1
+        elif self.kind == 'uniform':
+            factors = 1 + self.spread * rng.uniform(-1, 1, size)
+        else:
+            factors = 1 + self.spread * rng.triangular(-1, 0, 1, size)
+        factors *= rates
+        return np.clip(factors, 0, 100, out=factors)
+
+
+class MonteCarloResult:
+    """Percentile bands of the sampled stock, as a (percentiles x parts x years) array.
+
+    rows selects the stock_data rows of the parts (the leading ones by default).
+    """
+
+    def __init__(self, percentiles, years, stock_data, bands, rows=None):
+        self.percentiles = list(percentiles)
+        self.years = years
+        self.stock_data = stock_data
+        self.bands = bands
+        self.rows = rows
+
+    def band(self, percentile):
+        """Returns the unrounded (parts x years) stock at the given percentile."""
+        return self.bands[self.percentiles.index(percentile)]
+
+    def frame(self, percentile):
+        """Returns the stock table with the projected years set to the given percentile, truncated like update_stock."""
+        stock_data = self.stock_data.copy()
+        projection.store_projection(stock_data, self.band(percentile), self.years, self.rows)
+        return stock_data
+
+
+def simulate(base, additions, failure, success, samples, failure_distribution, success_distribution,
+             percentiles=(5, 50, 95), rng=None, max_bytes=256 * 1024 ** 2, progress=None):
+    """Projects every part under `samples` draws of its rates and reduces them to percentile bands.
+
+    Parts are simulated in chunks sized so that their samples take about max_bytes, and each
+    year's samples are reduced to the percentiles as soon as they are computed, so only the
+    current (samples x chunk) stock is ever held, whatever the number of samples or parts.
+    Rates are drawn independently per part and year, every PART_BLOCK parts from their own
+    generator spawned from rng, so a seed gives the same bands whatever max_bytes is; chunks
+    hold at least one block. progress is called with (parts done, parts).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    parts, years = additions.shape
+    bands = np.empty((len(percentiles), parts, years))
+    generators = rng.spawn(-(-parts // PART_BLOCK))
+    # The stock, two rate samples and the temporaries of a step are about 8 arrays of the chunk
+    chunk_blocks = max(1, max_bytes // (samples * 8 * np.dtype(np.float64).itemsize * PART_BLOCK))
+    for first_block in range(0, len(generators), chunk_blocks):
+        blocks = range(first_block, min(first_block + chunk_blocks, len(generators)))
+        start, stop = blocks[0] * PART_BLOCK, min(blocks[-1] * PART_BLOCK + PART_BLOCK, parts)
+        stock = np.broadcast_to(np.asarray(base[start:stop], dtype=np.float64), (samples, stop - start))
+        for j in range(years):
+            failure_samples, success_samples = [], []
+            for block in blocks:
+                rows = slice(block * PART_BLOCK, min(block * PART_BLOCK + PART_BLOCK, parts))
+                failure_samples.append(failure_distribution.sample(generators[block], failure[rows, j], samples))
+                success_samples.append(success_distribution.sample(generators[block], success[rows, j], samples))
+            stock = projection.end_of_year_stock(stock + additions[start:stop, j], np.hstack(failure_samples),
+                                                 np.hstack(success_samples))
+            bands[:, start:stop, j] = np.percentile(stock, percentiles, axis=0)
+        if progress is not None:
+            progress(stop, parts)
+    return bands
@@ -1,48 +1,50 @@
-import matplotlib.pyplot as plt
 import numpy as np
-from PyQt5.QtWidgets import QMessageBox
+import pandas as pd
+from matplotlib import rcParams
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
 
-class Plotter:
-    def __init__(self, database):
-        self.database = database
+from controllers.aggregation import top_contributors
+from models.compact import float_values
+from utils.instrumentation import instrumented
 
-    def plot_value_change(self, start_year, end_year):
-        """Generates a plot showing the change in stock values from start_year to end_year."""
-        stock_data = self.database.stock_data_changed
-        years = [str(year) for year in range(start_year, end_year + 1)]
 
-        missing_years = [year for year in years if year not in stock_data.columns]
-        if missing_years:
-            QMessageBox.warning(None, "Missing Data", f"Data for years {', '.join(missing_years)} is missing.")
-            return
+class MissingDataError(ValueError):
+    """Raised when the stock data has no column for some of the plotted years."""
 
-        fig, ax = plt.subplots(figsize=(7, 4))
-        bar_width = 0.5
-        stacked_values = {year: [0] * len(stock_data['Source']) for year in years}
 
-        for i, source in enumerate(stock_data['Source']):
-            try:
-                values = [float(stock_data.loc[stock_data['Source'] == source, year].iloc[0]) for year in years]
-            except IndexError:
-                print(f"Missing data for source {source} in some years.")
-                values = [0] * len(years)
+class Plotter:
+    LEGEND_LIMIT = 30  # Series beyond this are drawn without a legend by draw_value_change
+
+    def __init__(self, database, cache=None):
+        """cache is an optional ResultCache that remembers chart data of unchanged stock data."""
+        self.database = database
+        self.cache = cache
+        self.figure = None
+        self._colors = rcParams['axes.prop_cycle'].by_key()['color']
 
-            if not all(isinstance(v, (int, float)) and np.isfinite(v) for v in values):
-                print(f"Non-numeric or infinite data found for source {source}.")
-                values = [0 if not (isinstance(v, (int, float)) and np.isfinite(v)) else v for v in values]
+    @instrumented('Plotter.plot_value_change')
+    def plot_value_change(self, start_year, end_year, top_n=None, key='Source'):
+        """Generates a plot showing the change in stock values from start_year to end_year.
 
-            for j, year in enumerate(years):
-                stacked_values[year][i] = values[j]
+        With top_n, rows are summed per key column and only the top_n largest groups get their
+        own series; the rest is drawn as one "Other" series, which bounds the rendering cost.
+        """
+        sources, years, stacked_values = self.value_change_data(start_year, end_year, top_n, key)
 
-        bottom = np.zeros(len(years))
+        fig = Figure(figsize=(7, 4))  # Not pyplot, so charts can be built off the GUI thread
+        ax = fig.subplots()
+        bar_width = 0.5
+        # Running sums in row order, so every bar starts where adding them one by one would
+        bottoms = np.cumsum(np.vstack([np.zeros(len(years)), stacked_values]), axis=0)
 
-        for i, source in enumerate(stock_data['Source']):
-            values = [stacked_values[year][i] for year in years]
-            ax.bar(years, values, bottom=bottom, label=source, width=bar_width)
-            bottom += np.array(values)
+        for i, source in enumerate(sources):
+            ax.bar(years, stacked_values[i], bottom=bottoms[i], label=source, width=bar_width)
 
+        bottom = bottoms[-1]
         for i, year in enumerate(years):
-            total = sum(stacked_values[year])
+            total = bottom[i]
             ax.text(i, total + max(bottom) * 0.01, f'{total:.0f}', ha='center')
 
         ax.set_xlabel('Year')
@@ -53,5 +55,98 @@ class Plotter:
         ax.legend()
         ax.grid(False)
         ax.set_ylim(0, max(bottom) * 1.1 if np.isfinite(max(bottom)) else 1)
-        plt.close(fig)
         return fig
+
+    @instrumented('Plotter.value_change_data')
+    def value_change_data(self, start_year, end_year, top_n=None, key='Source'):
+        """Returns the series labels, the years and the (series x years) values of the value change chart."""
+        stock_data = self.database.stock_data_changed
+        years = [str(year) for year in range(start_year, end_year + 1)]
+
+        missing_years = [year for year in years if year not in stock_data.columns]
+        if missing_years:
+            raise MissingDataError(f"Data for years {', '.join(missing_years)} is missing.")
+
+        cache_key = None
+        if self.cache is not None and isinstance(stock_data, pd.DataFrame):
+            cache_key = self.cache.key('chart', [stock_data], start_year, end_year, top_n, key)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if top_n:
+            stock_data = top_contributors(stock_data, years, key, top_n)
+        chart_data = list(stock_data[key]), years, self._stacked_values(stock_data, years, key)
+        if cache_key:
+            self.cache.put(cache_key, chart_data)
+        return chart_data
+
+    @instrumented('Plotter.draw_value_change')
+    def draw_value_change(self, chart_data):
+        """Draws value_change_data() output quickly on a figure that is reused between calls.
+
+        Each year's stacked bars are a single PolyCollection instead of one patch per bar, and
+        only the data artists are replaced on later calls, so re-drawing takes milliseconds.
+        Must run on the thread that owns the canvas showing the figure.
+        """
+        sources, years, stacked_values = chart_data
+        if self.figure is None:
+            self.figure = Figure(figsize=(7, 4))
+            ax = self.figure.subplots()
+            ax.set_xlabel('Year')
+            ax.set_ylabel('Total Stock Level')
+            ax.set_title('Value Change for Stock Level')
+            ax.grid(False)
+        ax = self.figure.axes[0]
+        for artist in ax.collections + ax.texts:
+            artist.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+
+        bar_width = 0.5
+        colors = [self._colors[i % len(self._colors)] for i in range(len(sources))]
+        bottoms = np.cumsum(np.vstack([np.zeros(len(years)), stacked_values]), axis=0)
+        for j in range(len(years)):
+            left, right = j - bar_width / 2, j + bar_width / 2
+            lower, upper = bottoms[:-1, j], bottoms[1:, j]
+            vertices = np.stack([np.column_stack([np.full_like(lower, x), y])
+                                 for x, y in ((left, lower), (left, upper), (right, upper), (right, lower))], axis=1)
+            ax.add_collection(PolyCollection(vertices, facecolors=colors, edgecolors='none'))
+
+        bottom = bottoms[-1]
+        for i, year in enumerate(years):
+            total = bottom[i]
+            ax.text(i, total + max(bottom) * 0.01, f'{total:.0f}', ha='center')
+
+        ax.set_xticks(range(len(years)))
+        ax.set_xticklabels(years, rotation=45)
+        margin = 0.05 * max(len(years) - bar_width, 1)
+        ax.set_xlim(-bar_width / 2 - margin, len(years) - 1 + bar_width / 2 + margin)
+        ax.set_ylim(0, max(bottom) * 1.1 if np.isfinite(max(bottom)) and max(bottom) > 0 else 1)
+        if 0 < len(sources) <= self.LEGEND_LIMIT:
+            ax.legend([Patch(facecolor=color) for color in colors], [str(source) for source in sources])
+        return self.figure
+
+    def _stacked_values(self, stock_data, years, key='Source'):
+        """Returns the (sources x years) matrix of plotted values with non-finite values set to 0.
+
+        Rows repeating a key take the values of its first row and rows without a key
+        are 0, matching the per-source lookup this replaces.
+        """
+        sources = stock_data[key]
+        codes, _ = pd.factorize(sources)
+        values = float_values(stock_data, years)
+        known = np.flatnonzero(codes >= 0)
+        _, first_known = np.unique(codes[known], return_index=True)
+        first_rows = np.zeros(len(codes), dtype=np.int64)
+        first_rows[known] = known[first_known][codes[known]]
+
+        stacked_values = values[first_rows]
+        stacked_values[codes < 0] = 0
+        if (codes < 0).any():
+            print(f"Missing data for {(codes < 0).sum()} rows without a source.")
+
+        non_finite = ~np.isfinite(stacked_values)
+        if non_finite.any():
+            print(f"Non-numeric or infinite data found for sources {', '.join(map(str, sources[non_finite.any(axis=1)].unique()))}.")
+            stacked_values[non_finite] = 0
+        return stacked_values
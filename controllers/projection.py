@@ -0,0 +1,248 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from models.compact import float_values
+
+
+def projection_years(start_year, end_year, failure_rates, success_rates):
+    """Returns the years in the range that have both a failure and a success rate column."""
+    return [year for year in range(start_year, end_year + 1)
+            if str(year) in failure_rates.columns and str(year) in success_rates.columns]
+
+
+def table_arrays(stock_data, failure_rates, success_rates, years, alignment):
+    """Loads the rows paired by a RowAlignment as aligned float arrays (parts x years)."""
+    year_columns = [str(year) for year in years]
+    base = float_values(stock_data, ['2023'])[alignment.stock_rows, 0]
+    additions = float_values(stock_data, year_columns)[alignment.stock_rows]
+    additions[np.isnan(additions)] = 0
+    failure = float_values(failure_rates, year_columns)[alignment.failure_rows]
+    success = float_values(success_rates, year_columns)[alignment.success_rows]
+    return base, additions, failure, success
+
+
+def end_of_year_stock(stock, failure_rate, success_rate):
+    """Vectorized StockManager._calculate_end_of_year_stock, with identical floating point steps."""
+    consumed_parts = stock * (failure_rate / 100)
+    repaired_parts = np.where(success_rate > 0, consumed_parts * (success_rate / 100), 0)
+    final_stock = stock - consumed_parts + repaired_parts
+    return np.where(failure_rate == 0, stock, final_stock)
+
+
+def project(base, additions, failure, success, progress=None, out=None):
+    """Runs the yearly recurrence for all parts at once, one vector step per year.
+
+    The year axis is the last one, so any leading shape (parts, or scenarios x parts)
+    is projected in the same pass. Returns the unrounded end-of-year stock, written
+    into out when it is given. progress, if given, is called with (years done, years)
+    after every step.
+    """
+    current_stock = np.array(base, dtype=np.float64)
+    shape = np.broadcast_shapes(additions.shape, failure.shape, success.shape)
+    projected = np.empty(shape) if out is None else out
+    for j in range(projected.shape[-1]):
+        current_stock = end_of_year_stock(current_stock + additions[..., j], failure[..., j], success[..., j])
+        projected[..., j] = current_stock
+        if progress is not None:
+            progress(j + 1, projected.shape[-1])
+    return projected
+
+
+def project_parallel(base, additions, failure, success, workers=None, progress=None, pool=None):
+    """Runs project() on row chunks in a process pool and returns the rows in their original order.
+
+    Inputs and output live in shared memory, so workers attach to the tables by name
+    instead of receiving pickled copies. progress is called with (chunks done, chunks).
+    pool is an optional ProcessPoolExecutor to reuse across calls instead of starting one.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows = additions.shape[0]
+    if workers < 2 or rows < 2 * workers:
+        return project(base, additions, failure, success, progress)
+    bounds = np.linspace(0, rows, workers + 1, dtype=int)
+    return _project_in_pool((base, additions, failure, success), additions.shape, bounds, (True, True, True, True),
+                            workers, progress, pool=pool)
+
+
+def project_scenarios(base, additions, failure, success, workers=None, progress=None):
+    """Projects K rate scenarios of the same parts in one batched pass.
+
+    failure and success are (scenarios x parts x years), ideally laid out by year_major(),
+    while base and additions are shared by all scenarios; the result is the unrounded
+    (scenarios x parts x years) stock. With enough scenarios they are split into chunks
+    projected on `workers` processes (all cores by default). progress is called with
+    (parts done, parts) in process and with (chunks done, chunks) in the pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    shape = np.broadcast_shapes(additions.shape, failure.shape, success.shape)
+    if workers < 2 or shape[0] < 2 * workers:
+        return project_blocks(base, additions, failure, success, progress)
+    bounds = np.linspace(0, shape[0], workers + 1, dtype=int)
+    return _project_in_pool((base, additions, failure, success), shape, bounds, (False, False, True, True),
+                            workers, progress, project_blocks)
+
+
+def project_blocks(base, additions, failure, success, progress=None, block_size=65536):
+    """Runs project() on (scenarios x parts x years) inputs in blocks of parts.
+
+    Each yearly step of a block covers about block_size values of all scenarios, so its
+    temporaries stay in the CPU cache instead of streaming the whole cube through memory
+    once per operation. The result is year-major as well. progress is called with
+    (parts done, parts) after every block.
+    """
+    shape = np.broadcast_shapes(additions.shape, failure.shape, success.shape)
+    projected = year_major(shape)
+    step = max(1, block_size // max(shape[0], 1))
+    for start in range(0, shape[1], step):
+        stop = min(start + step, shape[1])
+        project(base[start:stop], additions[start:stop], failure[:, start:stop], success[:, start:stop],
+                out=projected[:, start:stop])
+        if progress is not None:
+            progress(stop, shape[1])
+    return projected
+
+
+def year_major(shape):
+    """Returns an empty array of the given shape stored year by year, so every yearly slice [..., j] is contiguous."""
+    return np.moveaxis(np.empty((shape[-1],) + tuple(shape[:-1])), 0, -1)
+
+
+def _project_in_pool(arrays, shape, bounds, sliced, workers, progress=None, engine=project, pool=None):
+    """Runs engine on the chunks between bounds on the first axis in a process pool, through shared memory.
+
+    sliced tells for each of base, additions, failure and success whether it is cut into the
+    chunks or shared whole by all of them. Without a pool, one of `workers` processes is started.
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return _project_in_pool(arrays, shape, bounds, sliced, workers, progress, engine, pool)
+    blocks = []
+    try:
+        inputs = [_to_shared_memory(array, blocks) for array in arrays]
+        output = _to_shared_memory(np.empty(shape), blocks)
+        chunks = [pool.submit(_project_shared_chunk, inputs, output, start, stop, sliced, engine)
+                  for start, stop in zip(bounds[:-1], bounds[1:])]
+        for done, chunk in enumerate(as_completed(chunks), 1):
+            chunk.result()
+            if progress is not None:
+                progress(done, len(chunks))
+        return _shared_array(output, blocks[-1]).copy()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _to_shared_memory(array, blocks):
+    """Copies array year-major into a new shared memory block and returns its (name, shape) handle."""
+    array = np.asarray(array, dtype=np.float64)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    _shared_array((block.name, array.shape), block)[...] = array
+    return block.name, array.shape
+
+
+def _shared_array(handle, block):
+    """Returns the array of a _to_shared_memory handle, viewed in its original shape."""
+    shape = handle[1]
+    return np.moveaxis(np.ndarray(shape[-1:] + shape[:-1], dtype=np.float64, buffer=block.buf), 0, -1)
+
+
+def _project_shared_chunk(inputs, output, start, stop, sliced=(True, True, True, True), engine=project):
+    """Process pool task: projects rows start:stop of the shared tables into the shared output."""
+    blocks = [shared_memory.SharedMemory(name=name) for name, _ in inputs + [output]]
+    try:
+        arrays = [_shared_array(handle, block) for handle, block in zip(inputs + [output], blocks)]
+        projected = arrays.pop()
+        projected[start:stop] = engine(*[array[start:stop] if cut else array for array, cut in zip(arrays, sliced)])
+        del arrays, projected
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def store_projection(stock_data, projected, years, rows=None):
+    """Writes the truncated projection into the given rows (the leading ones by default) of the year columns."""
+    rows = slice(0, projected.shape[0]) if rows is None else rows
+    for j, year in enumerate(years):
+        year_column = str(year)
+        values = stock_data[year_column].to_numpy(copy=True)
+        if values.dtype.kind in 'iu':
+            values = values.astype(np.int64)
+        elif values.dtype == np.float32:
+            values = float_values(stock_data, [year_column])[:, 0]  # Compact column, kept rows restored
+        values[rows] = np.trunc(projected[:, j]) + 0  # int() never yields -0.0
+        stock_data[year_column] = values
+
+
+def growth_factors(failure, success):
+    """Returns the per-year multiplier (1 - f/100 + f/100 * s/100) of the recurrence."""
+    consumed_share = failure / 100
+    repaired_share = consumed_share * np.where(success > 0, success / 100, 0)
+    return np.where(failure == 0, 1.0, 1 - consumed_share + repaired_share)
+
+
+class CumulativeProjection:
+    """Closed-form projection built from cumulative products and prefix sums.
+
+    Stock after year t is x_t = (x_{t-1} + a_t) * g_t, so with P_t = g_1 * ... * g_t
+    it equals P_t * (x_0 + sum(a_k / P_{k-1})). A zero factor wipes out everything
+    before it, so products restart after the last zero and x_0 only counts when
+    there is none. Any year of every part is then read in O(1) without stepping
+    through the years in between; parts whose products leave the float64 range are
+    projected by project() when the object is built. Results agree with project() up to floating point
+    rounding, so a truncated value can differ by one when it lies on an integer boundary.
+    """
+
+    def __init__(self, base, additions, failure, success, years):
+        self.years = list(years)
+        self.base = np.asarray(base, dtype=np.float64)
+        factors = growth_factors(failure, success)
+        zero = factors == 0
+        with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+            self.cumulative = np.cumprod(np.where(zero, 1.0, factors), axis=-1)
+            previous = np.concatenate([np.ones_like(self.cumulative[..., :1]), self.cumulative[..., :-1]], axis=-1)
+            self.prefix = np.cumsum(additions / previous, axis=-1)
+        # 1-based position of the last zero factor up to each year, 0 if there is none
+        self.last_zero = np.maximum.accumulate(np.where(zero, np.arange(1, len(self.years) + 1), 0), axis=-1)
+        # Over long horizons the products of small factors underflow (or large ones overflow), which
+        # would turn the stock into NaN; those parts are projected step by step instead
+        shape = self.prefix.shape
+        out_of_range = ~(self.cumulative >= np.finfo(np.float64).tiny) | ~np.isfinite(self.cumulative)
+        out_of_range = np.broadcast_to(out_of_range.any(axis=-1), shape[:-1])
+        self.stepwise_rows = out_of_range | ~np.isfinite(self.prefix).all(axis=-1)
+        self.stepwise = None
+        if self.stepwise_rows.any():
+            inputs = [np.broadcast_to(array, shape)[self.stepwise_rows] for array in (additions, failure, success)]
+            self.stepwise = project(np.broadcast_to(self.base, shape[:-1])[self.stepwise_rows], *inputs)
+
+    def stock_at(self, position):
+        """Returns the unrounded stock of every part at the given year position."""
+        last_zero = self.last_zero[..., position]
+        restarted = last_zero > 0
+        before_zero = np.take_along_axis(self.prefix, np.maximum(last_zero - 1, 0)[..., None], axis=-1)[..., 0]
+        with np.errstate(over='ignore', invalid='ignore'):
+            since_zero = self.prefix[..., position] - np.where(restarted, before_zero, 0)
+            stock = self.cumulative[..., position] * (np.where(restarted, 0, self.base) + since_zero)
+        if self.stepwise is not None:
+            stock = np.array(np.broadcast_to(stock, self.stepwise_rows.shape))
+            stock[self.stepwise_rows] = self.stepwise[:, position]
+        return stock
+
+    def stock_in_year(self, year):
+        """Returns the truncated stock of every part at the end of the given year."""
+        if int(year) not in self.years:
+            raise ValueError(f"Year {year} is not part of the projection.")
+        return np.trunc(self.stock_at(self.years.index(int(year)))) + 0
+
+    def to_array(self, progress=None):
+        """Returns the unrounded stock for all years, shaped like project()."""
+        projected = np.empty(self.cumulative.shape)
+        for position in range(len(self.years)):
+            projected[..., position] = self.stock_at(position)
+            if progress is not None:
+                progress(position + 1, len(self.years))
+        return projected
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class ResultCache:
+    """LRU cache of projection and chart results, keyed on the content of their input tables.
+
+    Entries are evicted least recently used first once they take more than max_bytes of
+    memory. With a directory, entries are also pickled there so they survive restarts; that
+    tier is trimmed to max_disk_bytes, oldest used first.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, directory=None, max_disk_bytes=2 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, kind, tables, *parameters):
+        """Builds the cache key of a result from the content of its input tables and its parameters."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr((kind, parameters)).encode())
+        for table in tables:
+            digest.update(table_hash(table).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the cached value for key, or None."""
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+        value = self._read_disk(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Caches value under key, evicting the least recently used entries beyond the memory cap."""
+        self._remember(key, value)
+        self._write_disk(key, value)
+
+    def clear(self):
+        """Drops all in-memory entries; the disk tier is kept."""
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remember(self, key, value):
+        size = size_of(value)
+        with self._lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _read_disk(self, key):
+        """Returns the value pickled for key, or None; an entry that fails to load is deleted."""
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as cache_file:
+                value = pickle.load(cache_file)
+            os.utime(self._path(key))  # Mark as recently used
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # Truncated, or pickled by a version of the app whose classes changed
+            print(f"Dropping unreadable result cache entry {key}: {e}")
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, key, value):
+        if self.directory is None:
+            return
+        temp_path = self._path(key) + '.tmp'
+        try:
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+            self._trim_disk()
+        except OSError as e:
+            print(f"Could not write result cache entry: {e}")
+
+    def _trim_disk(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+        files = sorted((os.stat(path).st_mtime, os.stat(path).st_size, path) for path in files)
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def table_hash(table):
+    """Returns a content hash of a DataFrame: its columns, dtypes and values in row order."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((list(table.columns), [str(dtype) for dtype in table.dtypes])).encode())
+    digest.update(pd.util.hash_pandas_object(table, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def size_of(value):
+    """Estimates the memory taken by a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    return sys.getsizeof(value)
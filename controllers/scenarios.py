@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from controllers import projection
+from models.compact import float_values
+
+
+class Scenario:
+    """One what-if run: rate tables and multipliers applied to the shared stock table.
+
+    Tables left as None are taken from the database; the multipliers scale every rate
+    of their table, so Scenario('Worse', failure_scale=1.2) is 20% more failures.
+    """
+
+    def __init__(self, name, failure_rates=None, success_rates=None, failure_scale=1.0, success_scale=1.0):
+        self.name = name
+        self.failure_rates = failure_rates
+        self.success_rates = success_rates
+        self.failure_scale = failure_scale
+        self.success_scale = success_scale
+
+    @classmethod
+    def from_files(cls, name, database, failure_file=None, success_file=None, failure_scale=1.0, success_scale=1.0):
+        """Builds a scenario from rate CSV files, read like the database reads its own tables."""
+        return cls(name,
+                   database.read_table(failure_file) if failure_file else None,
+                   database.read_table(success_file) if success_file else None,
+                   failure_scale, success_scale)
+
+
+class ScenarioResult:
+    """Projected stock of every scenario, as a truncated (scenarios x parts x years) array."""
+
+    def __init__(self, names, years, stock_data, projected):
+        self.names = list(names)
+        self.years = years
+        self.stock_data = stock_data
+        self.values = np.trunc(projected, out=projected)  # In place, the cube can be large
+        self.values += 0  # int() never yields -0.0
+
+    def frame(self, name):
+        """Returns the stock table of one scenario, as update_stock would have projected it."""
+        stock_data = self.stock_data.copy()
+        projection.store_projection(stock_data, self.values[self.names.index(name)], self.years)
+        return stock_data
+
+    def totals(self):
+        """Returns the total projected stock per scenario (rows) and year (columns)."""
+        return pd.DataFrame(self.values.sum(axis=1), index=self.names, columns=[str(year) for year in self.years])
+
+
+def rate_cube(tables, scales, year_columns, rows):
+    """Stacks the scaled first rows of the rate tables into one year-major (scenarios x parts x years) array.
+
+    Missing rates count as 0, like in update_stock.
+    """
+    cube = projection.year_major((len(tables), rows, len(year_columns)))
+    arrays = {}
+    for k, (table, scale) in enumerate(zip(tables, scales)):
+        if id(table) not in arrays:  # Scenarios that only differ in multipliers share one table
+            array = float_values(table, year_columns)[:rows]
+            array[np.isnan(array)] = 0
+            arrays[id(table)] = array
+        np.multiply(arrays[id(table)], scale, out=cube[k])
+    return cube
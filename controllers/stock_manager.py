@@ -1,43 +1,350 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
 import numpy as np
 
+from controllers import projection
+from controllers.alignment import RowAlignment
+from controllers.monte_carlo import MonteCarloResult, RateDistribution, simulate
+from controllers.scenarios import ScenarioResult, rate_cube
+from models.mapped_table import MappedTable
+from utils.instrumentation import instrumented
+
+
+class ProjectionState:
+    """Unrounded result of the last projection, kept so edited rows can be re-projected."""
+
+    def __init__(self, start_year, end_year, years, projected, tables, stock_dtypes, result, alignment):
+        self.start_year = start_year
+        self.end_year = end_year
+        self.years = years
+        self.projected = projected
+        self.tables = tables
+        self.table_lengths = [len(table) for table in tables]  # Rows appended later change the pairing
+        self.stock_dtypes = stock_dtypes
+        self.result = result
+        self.alignment = alignment
+
+    def matches(self, database, start_year, end_year, key=None):
+        """Tells whether the state still describes the database tables and year range.
+
+        Only projections of rows paired by position can be patched row by row.
+        """
+        tables = (database.stock_data, database.failure_data, database.success_data)
+        return (key is None and self.alignment.key is None
+                and self.start_year == start_year and self.end_year == end_year
+                and all(table is known for table, known in zip(tables, self.tables))
+                and [len(table) for table in tables] == self.table_lengths
+                and database.stock_data_changed is self.result
+                and list(database.stock_data.columns) == list(self.result.columns[:database.stock_data.shape[1]])
+                and database.stock_data.dtypes.equals(self.stock_dtypes)
+                and projection.projection_years(start_year, end_year, database.failure_data,
+                                                database.success_data) == self.years)
+
+
 class StockManager:
-    def __init__(self, database):
-        self.database = database
+    MODES = ('stepwise', 'cumulative', 'parallel')
 
-    def update_stock(self, start_year, end_year):
-        """Updates the stock data from start_year to end_year."""
-        stock_data_copy = self.database.stock_data.copy().fillna(0)  # Use a copy of the original stock data and fill NaNs with 0
-        failure_rates = self.database.failure_data.fillna(0)
-        success_rates = self.database.success_data.fillna(0)
+    def __init__(self, database, cache=None, key=None):
+        """cache is an optional ResultCache that remembers projections of unchanged tables.
 
-        for year in range(start_year, end_year + 1):
-            year_column = str(year)
-            if year_column not in stock_data_copy.columns:
-                stock_data_copy[year_column] = np.nan
+        key names a part ID column (like 'Source') present in all three tables; when given,
+        stock rows are paired with the rate rows of the same part instead of the rows at the
+        same position. The RowAlignment of the last projection is kept in alignment.
+        """
+        self.database = database
+        self.cache = cache
+        self.key = key
+        self.alignment = None
+        self.last_projection = None
 
-        for index, row in stock_data_copy.iterrows():
-            if index < len(failure_rates) and index < len(success_rates):
-                self._update_yearly_data(stock_data_copy, index, start_year, end_year, failure_rates, success_rates)
+    @instrumented('StockManager.update_stock', rows=len)
+    def update_stock(self, start_year, end_year, mode='stepwise', workers=None, progress=None):
+        """Updates the stock data from start_year to end_year.
 
+        mode 'stepwise' runs the yearly recurrence, 'cumulative' reads every year from
+        the closed-form CumulativeProjection instead and 'parallel' splits the parts into
+        row chunks projected on `workers` processes (all cores by default).
+        progress, if given, is called with (steps done, steps) while the projection runs;
+        an exception raised from it aborts the update.
+        """
+        self._check_mode(mode)
+        if isinstance(self.database.stock_data, MappedTable):
+            return self._update_mapped_stock(start_year, end_year, mode, workers, progress)
+        tables = (self.database.stock_data, self.database.failure_data, self.database.success_data)
+        cache_key = (self.cache.key('projection', tables, start_year, end_year, mode, self.key)
+                     if self.cache else None)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            # Copies, so later in-place patches do not reach the cached result
+            stock_data_copy, years, projected, alignment = cached[0].copy(), cached[1], cached[2].copy(), cached[3]
+        else:
+            stock_data_copy, years, projected, alignment = self._project_tables(*tables, start_year, end_year, mode,
+                                                                                workers, progress)
+            if cache_key:
+                self.cache.put(cache_key, (stock_data_copy.copy(), years, projected.copy(), alignment))
+        self._report_unmatched(alignment, *tables)
+        self.last_projection = ProjectionState(start_year, end_year, years, projected, tables,
+                                               self.database.stock_data.dtypes, stock_data_copy, alignment)
+        self.database.dirty_rows.clear()
         self.database.stock_data_changed = stock_data_copy
         return stock_data_copy  # Return the updated stock data copy
 
-    def _update_yearly_data(self, stock_data, index, start_year, end_year, failure_rates, success_rates):
-        """Helper method to update stock data for each year."""
-        current_stock = float(stock_data.at[index, '2023'])
+    @instrumented('StockManager.update_stock_incremental', rows=len)
+    def update_stock_incremental(self, start_year, end_year, progress=None):
+        """Re-projects only the rows edited since the last update, from their earliest edited year on.
+
+        The rows are patched into stock_data_changed in place. Falls back to a full update_stock
+        when the tables, their shape or the year range changed since the last projection, and always
+        when rows are paired by key.
+        """
+        state = self.last_projection
+        if state is None or not state.matches(self.database, start_year, end_year, self.key):
+            return self.update_stock(start_year, end_year, progress=progress)
+
+        stock_data = self.database.stock_data
+        stock_data_changed = self.database.stock_data_changed
+        dirty_rows = dict(self.database.dirty_rows)
+        rows = state.projected.shape[0]
+        positions = np.array(sorted(dirty_rows), dtype=np.int64)
+        for row in positions[positions >= len(stock_data)]:
+            self.database.dirty_rows.pop(row, None)  # Rate rows past the stock table have no stock row to patch
+        positions = positions[positions < len(stock_data)]
+        projected_positions = positions[positions < rows]
+
+        if len(projected_positions):
+            stock_rows, _, (base, additions, failure, success), _ = self._prepare_projection(
+                stock_data.iloc[projected_positions], self.database.failure_data.iloc[projected_positions],
+                self.database.success_data.iloc[projected_positions], start_year, end_year)
+            # Rows restart at the first projected year on or after their earliest edit
+            first_positions = np.searchsorted(state.years, [dirty_rows[row] for row in projected_positions])
+            groups = np.unique(first_positions)
+            for done, first in enumerate(groups, 1):
+                members = np.flatnonzero(first_positions == first)
+                if first < len(state.years):
+                    start_stock = base[members] if first == 0 else state.projected[projected_positions[members], first - 1]
+                    state.projected[projected_positions[members], first:] = projection.project(
+                        start_stock, additions[members, first:], failure[members, first:], success[members, first:])
+                if progress is not None:
+                    progress(done, len(groups))
+            projection.store_projection(stock_rows, state.projected[projected_positions], state.years)
+            self._patch_rows(stock_data_changed, projected_positions, stock_rows)
+
+        other_positions = positions[positions >= rows]
+        if len(other_positions):
+            stock_rows = stock_data.iloc[other_positions].fillna(0)
+            self._patch_rows(stock_data_changed, other_positions, stock_rows)
+
+        for row in positions:
+            self.database.dirty_rows.pop(row, None)
+        return stock_data_changed
+
+    def _patch_rows(self, stock_data_changed, positions, stock_rows):
+        """Writes the given rows into stock_data_changed, column by column."""
+        for j, column in enumerate(stock_data_changed.columns):
+            if column in stock_rows.columns:
+                stock_data_changed.iloc[positions, j] = stock_rows[column].to_numpy()
+
+    def stream_stock(self, stock_file, failure_file, success_file, output_file, start_year, end_year,
+                     chunk_size=100000, mode='stepwise', workers=None):
+        """Projects the three CSV files chunk by chunk straight into output_file (CSV, Parquet or Feather).
+
+        Memory stays bounded by chunk_size rows, and the written file is the same as saving
+        the result of update_stock on the fully loaded tables. Chunks pair rows by position.
+        """
+        self._check_mode(mode)
+        self._check_positional("Streaming")
+        failure_header = self.database.read_header(failure_file)
+        success_header = self.database.read_header(success_file)
+        # A first pass pins the column dtypes, so every chunk is written like the whole table would be
+        dtypes = self.database.scan_dtypes(stock_file, chunk_size)
+        failure_chunks = self.database.read_chunks(failure_file, chunk_size)
+        success_chunks = self.database.read_chunks(success_file, chunk_size)
+        rows = 0
+
+        def projected_chunks():
+            nonlocal rows
+            for stock_chunk in self.database.read_chunks(stock_file, chunk_size, dtypes):
+                failure_chunk = next(failure_chunks, None)
+                success_chunk = next(success_chunks, None)
+                stock_chunk, _, _, _ = self._project_tables(
+                    stock_chunk,
+                    failure_chunk if failure_chunk is not None else failure_header,
+                    success_chunk if success_chunk is not None else success_header,
+                    start_year, end_year, mode, workers)
+                rows += len(stock_chunk)
+                yield stock_chunk
+
+        self.database.save_frames(projected_chunks(), output_file)
+        return rows
+
+    def _update_mapped_stock(self, start_year, end_year, mode, workers, progress=None, chunk_size=65536):
+        """Projects mapped tables row chunk by row chunk into a mapped output table."""
+        self._check_positional("Memory-mapped tables")
+        stock_data = self.database.stock_data
+        failure_rates = self.database.failure_data
+        success_rates = self.database.success_data
+        new_columns = [str(year) for year in range(start_year, end_year + 1) if str(year) not in stock_data.columns]
+        if isinstance(self.database.stock_data_changed, MappedTable):
+            self.database.stock_data_changed.close()  # Its backing file is about to be rewritten
+        stock_data_changed = MappedTable.create(
+            self.database.storage_path('stock_changed'), stock_data.index, stock_data.columns + new_columns,
+            stock_data.column_order + new_columns, stock_data.values.dtype)
+
+        rows = min(len(stock_data), len(failure_rates), len(success_rates))
+        years = projection.projection_years(start_year, end_year, failure_rates, success_rates)
+        output_positions = [stock_data_changed.columns.index(str(year)) for year in years]
+        failure_positions = [failure_rates.columns.index(str(year)) for year in years]
+        success_positions = [success_rates.columns.index(str(year)) for year in years]
+        base_position = stock_data.columns.index('2023')
+
+        # One process pool serves all row chunks in parallel mode
+        with ProcessPoolExecutor(max_workers=workers) if mode == 'parallel' else nullcontext() as pool:
+            for start, stop in stock_data_changed.row_chunks(chunk_size):
+                values = stock_data_changed.values[start:stop]
+                values[:, :len(stock_data.columns)] = stock_data.values[start:stop]
+                values[:, len(stock_data.columns):] = np.nan
+                projected_rows = min(stop, rows) - start
+                if projected_rows <= 0 or not years:
+                    continue
+                additions = values[:projected_rows, output_positions].astype(np.float64)
+                additions[np.isnan(additions)] = 0
+                arrays = (stock_data.values[start:start + projected_rows, base_position].astype(np.float64),
+                          additions,
+                          failure_rates.values[start:start + projected_rows, failure_positions].astype(np.float64),
+                          success_rates.values[start:start + projected_rows, success_positions].astype(np.float64))
+                values[:projected_rows, output_positions] = np.trunc(
+                    self._run_projection(mode, arrays, years, workers, pool=pool)) + 0
+                if progress is not None:
+                    progress(stop, len(stock_data_changed))
+        stock_data_changed.flush()
+
+        self.database.stock_data_changed = stock_data_changed
+        return stock_data_changed
+
+    def cumulative_projection(self, start_year, end_year):
+        """Returns a CumulativeProjection answering per-year stock queries in O(1) per part."""
+        _, years, arrays, self.alignment = self._prepare_projection(
+            self.database.stock_data, self.database.failure_data, self.database.success_data, start_year, end_year,
+            self.key)
+        return projection.CumulativeProjection(*arrays, years)
+
+    def run_scenarios(self, scenarios, start_year, end_year, workers=None, progress=None):
+        """Projects the stock data under every Scenario in one batched pass and returns a ScenarioResult.
+
+        All scenarios share the stock table and are projected together as a (scenarios x parts x years)
+        array, so K scenarios cost far less than K update_stock calls; with many scenarios they are
+        spread over `workers` processes (all cores by default). Only years with rates in every
+        scenario are projected, and parts beyond the shortest rate table are left untouched.
+        """
+        if isinstance(self.database.stock_data, MappedTable):
+            raise ValueError("Scenarios need the stock data loaded in memory, not memory-mapped.")
+        self._check_positional("Scenarios")
+        if not scenarios:
+            raise ValueError("No scenarios to project.")
+        failure_tables = [self.database.failure_data if scenario.failure_rates is None else scenario.failure_rates
+                          for scenario in scenarios]
+        success_tables = [self.database.success_data if scenario.success_rates is None else scenario.success_rates
+                          for scenario in scenarios]
+
+        stock_data_copy = self.database.stock_data.copy().fillna(0)
+        for year in range(start_year, end_year + 1):
+            if str(year) not in stock_data_copy.columns:
+                stock_data_copy[str(year)] = np.nan
+        alignment = RowAlignment.by_position(len(stock_data_copy), min(len(table) for table in failure_tables),
+                                             min(len(table) for table in success_tables))
+        rows = alignment.stock_rows.stop
+        years = [year for year in range(start_year, end_year + 1)
+                 if all(str(year) in table.columns for table in failure_tables + success_tables)]
+        year_columns = [str(year) for year in years]
+
+        base, additions, _, _ = projection.table_arrays(stock_data_copy, failure_tables[0], success_tables[0],
+                                                        years, alignment)
+        failure = rate_cube(failure_tables, [scenario.failure_scale for scenario in scenarios], year_columns, rows)
+        success = rate_cube(success_tables, [scenario.success_scale for scenario in scenarios], year_columns, rows)
+        projected = projection.project_scenarios(base, additions, failure, success, workers, progress)
+        return ScenarioResult([scenario.name for scenario in scenarios], years, stock_data_copy, projected)
+
+    def monte_carlo(self, start_year, end_year, samples=1000, failure_distribution=None, success_distribution=None,
+                    percentiles=(5, 50, 95), seed=None, max_bytes=256 * 1024 ** 2, progress=None):
+        """Projects the stock data under `samples` random draws of the rates and returns a MonteCarloResult.
+
+        Rates are drawn per part and year from the RateDistributions (10% normal noise by default)
+        centered on the loaded rates, with a numpy Generator seeded by seed. The samples are
+        reduced to the given percentiles in chunks of about max_bytes, so memory does not grow
+        with the number of samples.
+        """
+        if isinstance(self.database.stock_data, MappedTable):
+            raise ValueError("Monte Carlo projections need the stock data loaded in memory, not memory-mapped.")
+        stock_data_copy, years, arrays, self.alignment = self._prepare_projection(
+            self.database.stock_data, self.database.failure_data, self.database.success_data, start_year, end_year,
+            self.key)
+        self._report_unmatched(self.alignment, self.database.stock_data, self.database.failure_data,
+                               self.database.success_data)
+        bands = simulate(*arrays, samples, failure_distribution or RateDistribution(),
+                         success_distribution or RateDistribution(), percentiles, np.random.default_rng(seed),
+                         max_bytes, progress)
+        return MonteCarloResult(percentiles, years, stock_data_copy, bands, self.alignment.stock_rows)
+
+    def _project_tables(self, stock_data, failure_data, success_data, start_year, end_year, mode, workers,
+                        progress=None):
+        """Returns a projected copy of stock_data, its years, the unrounded projection and the RowAlignment."""
+        stock_data_copy, years, arrays, alignment = self._prepare_projection(
+            stock_data, failure_data, success_data, start_year, end_year, self.key)
+        projected = self._run_projection(mode, arrays, years, workers, progress)
+        projection.store_projection(stock_data_copy, projected, years, alignment.stock_rows)
+        return stock_data_copy, years, projected, alignment
+
+    def _check_mode(self, mode):
+        """Raises a ValueError for an unknown projection mode."""
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown projection mode '{mode}', expected one of {', '.join(self.MODES)}.")
+
+    def _check_positional(self, what):
+        """Raises a ValueError when rows are to be paired by key, which the given code path cannot do."""
+        if self.key is not None:
+            raise ValueError(f"{what} pair rows by position and cannot match them by '{self.key}'.")
+
+    def _report_unmatched(self, alignment, stock_data, failure_data, success_data):
+        """Prints the rows a key alignment could not pair; their stock is left unprojected."""
+        self.alignment = alignment
+        if alignment.key is not None and not alignment.complete:
+            print(f"Warning: rows not matched by '{alignment.key}':\n"
+                  f"{alignment.describe(stock_data, failure_data, success_data)}")
+
+    def _run_projection(self, mode, arrays, years, workers, progress=None, pool=None):
+        """Runs the projection engine selected by mode and returns the unrounded stock.
+
+        pool is an optional ProcessPoolExecutor the parallel mode reuses.
+        """
+        if mode == 'cumulative':
+            return projection.CumulativeProjection(*arrays, years).to_array(progress)
+        if mode == 'parallel':
+            return projection.project_parallel(*arrays, workers=workers, progress=progress, pool=pool)
+        return projection.project(*arrays, progress=progress)
+
+    def _prepare_projection(self, stock_data, failure_data, success_data, start_year, end_year, key=None):
+        """Builds the output table, the aligned arrays the projection engines work on and their RowAlignment.
+
+        Rows are paired on the key column when one is given, and by position otherwise.
+        """
+        stock_data_copy = stock_data.copy().fillna(0)  # Use a copy of the original stock data and fill NaNs with 0
+        failure_rates = failure_data.fillna(0)
+        success_rates = success_data.fillna(0)
 
         for year in range(start_year, end_year + 1):
             year_column = str(year)
-            if year_column in failure_rates.columns and year_column in success_rates.columns:
-                if not np.isnan(stock_data.at[index, year_column]):
-                    current_stock += float(stock_data.at[index, year_column])
-
-                current_stock = self._calculate_end_of_year_stock(
-                    current_stock,
-                    float(failure_rates.at[index, year_column]),
-                    float(success_rates.at[index, year_column])
-                )
-                stock_data.at[index, year_column] = int(current_stock)
+            if year_column not in stock_data_copy.columns:
+                stock_data_copy[year_column] = np.nan
+
+        # Rows without rates are left untouched; by_key also leaves out rows whose key is missing (filled with 0)
+        if key is None:
+            alignment = RowAlignment.by_position(len(stock_data_copy), len(failure_rates), len(success_rates))
+        else:
+            alignment = RowAlignment.by_key(stock_data, failure_data, success_data, key)
+        years = projection.projection_years(start_year, end_year, failure_rates, success_rates)
+        arrays = projection.table_arrays(stock_data_copy, failure_rates, success_rates, years, alignment)
+        return stock_data_copy, years, arrays, alignment
 
     def _calculate_end_of_year_stock(self, stock, failure_rate, success_rate):
         """Calculates the stock level at the end of the year."""
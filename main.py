@@ -1,21 +1,42 @@
+import os
+import shutil
 import sys
+import threading
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QLabel, QLineEdit, \
-    QTableWidget, QTableWidgetItem, QFileDialog, QMessageBox, QGridLayout, QHBoxLayout
-from PyQt5.QtCore import Qt
+    QTableView, QAbstractItemView, QFileDialog, QMessageBox, QGridLayout, QHBoxLayout, QProgressBar, QSpinBox, QCheckBox, \
+    QShortcut
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
+from PyQt5.QtGui import QKeySequence
 from PyQt5 import QtWidgets
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import pandas as pd
-from models.database import Database
-from controllers.stock_manager import StockManager
-from controllers.plotter import Plotter
+from views.table_model import DataFrameModel
+from views.timings import TimingLabel
+from views.worker import Job
+from utils.instrumentation import instrumented, recorder
+
+# Loaded tables and their edits are journaled under here, in one directory per session, so they survive a crash
+AUTOSAVE_DIR = os.path.join(os.path.expanduser('~'), '.stock_management_autosave')
+
+
+def prewarm_imports():
+    """Imports pandas, NumPy and matplotlib through the data and chart modules.
+
+    main.py only imports Qt at startup so the window shows quickly; this runs on a
+    background thread right after, so the first load or chart does not wait for them.
+    """
+    import models.database
+    import controllers.stock_manager
+    import controllers.plotter
+    import controllers.result_cache
+    import matplotlib.backends.backend_qt5agg
 
 
 class App(QMainWindow):
-    def __init__(self):
+    def __init__(self, offer_restore=True):
+        """offer_restore asks, once the window shows, whether to restore the tables a crashed session autosaved."""
         super().__init__()
-        self.database = Database()
-        self.stock_manager = None
+        self._database = None
+        self._stock_manager = None
+        self._result_cache = None
         self.plotter = None
 
         self.stock_file_path = ""
@@ -23,8 +44,37 @@ class App(QMainWindow):
         self.success_file_path = ""
 
         self.current_fig = None
+        self.current_job = None
+        self.current_job_cancellable = False
 
         self.init_ui()
+        QTimer.singleShot(0, lambda: threading.Thread(target=prewarm_imports, daemon=True).start())
+        if offer_restore:
+            QTimer.singleShot(0, self.offer_autosave_restore)
+
+    @property
+    def database(self):
+        """The Database, created on first use so pandas is not imported before the window shows."""
+        if self._database is None:
+            from models.autosave import Autosave
+            from models.database import Database
+            self._database = Database(autosave=Autosave(os.path.join(AUTOSAVE_DIR, str(os.getpid()))))
+        return self._database
+
+    @property
+    def result_cache(self):
+        """In-memory cache of projections and chart data, so repeated runs return at once."""
+        if self._result_cache is None:
+            from controllers.result_cache import ResultCache
+            self._result_cache = ResultCache()
+        return self._result_cache
+
+    @property
+    def stock_manager(self):
+        if self._stock_manager is None:
+            from controllers.stock_manager import StockManager
+            self._stock_manager = StockManager(self.database, self.result_cache)
+        return self._stock_manager
 
     def init_ui(self):
         """Initialize the UI components."""
@@ -59,12 +109,21 @@ class App(QMainWindow):
         self.changed_stock_label = QLabel("5. Update Stock Data ", self)
         right_column_layout.addWidget(self.changed_stock_label)
 
+        update_stock_layout = QHBoxLayout()
         self.update_stock_button = QPushButton("Update Stock", self)
         self.update_stock_button.clicked.connect(self.update_stock)
-        right_column_layout.addWidget(self.update_stock_button)
-
-        self.changed_table_stock = QTableWidget(self)
-        self.changed_table_stock.resizeColumnsToContents()
+        update_stock_layout.addWidget(self.update_stock_button)
+
+        self.match_key_label = QLabel("Match rows by", self)
+        update_stock_layout.addWidget(self.match_key_label)
+        self.match_key_entry = QLineEdit(self)
+        self.match_key_entry.setPlaceholderText("position")
+        self.match_key_entry.setToolTip("Column identifying a part in all three tables, e.g. Source; "
+                                        "leave empty to pair the rows by their position")
+        update_stock_layout.addWidget(self.match_key_entry)
+        right_column_layout.addLayout(update_stock_layout)
+
+        self.changed_table_stock = QTableView(self)
         right_column_layout.addWidget(self.changed_table_stock)
 
         # Save updated stock data button
@@ -81,6 +140,20 @@ class App(QMainWindow):
         self.plot_button.clicked.connect(self.plot_value_change)
         plot_button_layout.addWidget(self.plot_button)
 
+        self.top_sources_label = QLabel("Top sources", self)
+        plot_button_layout.addWidget(self.top_sources_label)
+        self.top_sources_entry = QSpinBox(self)
+        self.top_sources_entry.setRange(0, 1000)
+        self.top_sources_entry.setValue(20)
+        self.top_sources_entry.setSpecialValueText("All")  # 0 draws every source as its own series
+        self.top_sources_entry.setToolTip("Sources beyond the largest ones are drawn as a single \"Other\" series")
+        plot_button_layout.addWidget(self.top_sources_entry)
+
+        self.fast_chart_entry = QCheckBox("Fast rendering", self)
+        self.fast_chart_entry.setChecked(True)
+        self.fast_chart_entry.setToolTip("Draw bars as collections on a reused chart instead of a new figure")
+        plot_button_layout.addWidget(self.fast_chart_entry)
+
         self.save_plot_button = QPushButton("Save Chart to...", self)
         self.save_plot_button.clicked.connect(self.save_plot_to_png)
         plot_button_layout.addWidget(self.save_plot_button)
@@ -105,7 +178,7 @@ class App(QMainWindow):
         stock_button_layout.addWidget(self.load_stock_button)
 
         self.add_row_stock_button = QPushButton("Add Row", self)
-        self.add_row_stock_button.clicked.connect(lambda: self.add_row(self.table_stock, self.database.stock_data))
+        self.add_row_stock_button.clicked.connect(lambda: self.add_row(self.table_stock, 'stock'))
         stock_button_layout.addWidget(self.add_row_stock_button)
 
         self.add_column_stock_button = QPushButton("Add Column", self)
@@ -115,11 +188,16 @@ class App(QMainWindow):
         self.save_stock_button = QPushButton("Save Stock Data", self)
         self.save_stock_button.clicked.connect(lambda: self.save_data('stock'))
         stock_button_layout.addWidget(self.save_stock_button)
+
+        self.show_changes_button = QPushButton("Show Changes", self)
+        self.show_changes_button.setToolTip("List the cells edited since the tables were loaded (Ctrl+Z undoes, "
+                                            "Ctrl+Y redoes an edit)")
+        self.show_changes_button.clicked.connect(self.show_changes)
+        stock_button_layout.addWidget(self.show_changes_button)
         left_column_layout.addLayout(stock_button_layout)
 
-        self.table_stock = QTableWidget(self)
-        self.table_stock.setEditTriggers(QTableWidget.AllEditTriggers)  # Allows editing data in the table
-        self.table_stock.resizeColumnsToContents()
+        self.table_stock = QTableView(self)
+        self.table_stock.setEditTriggers(QAbstractItemView.AllEditTriggers)  # Allows editing data in the table
         left_column_layout.addWidget(self.table_stock)
 
         # Failure Table
@@ -132,7 +210,7 @@ class App(QMainWindow):
         failure_button_layout.addWidget(self.load_failure_button)
 
         self.add_row_failure_button = QPushButton("Add Row", self)
-        self.add_row_failure_button.clicked.connect(lambda: self.add_row(self.table_failure, self.database.failure_data))
+        self.add_row_failure_button.clicked.connect(lambda: self.add_row(self.table_failure, 'failure'))
         failure_button_layout.addWidget(self.add_row_failure_button)
 
         self.save_failure_button = QPushButton("Save Failure Rates", self)
@@ -140,8 +218,7 @@ class App(QMainWindow):
         failure_button_layout.addWidget(self.save_failure_button)
         left_column_layout.addLayout(failure_button_layout)
 
-        self.table_failure = QTableWidget(self)
-        self.table_failure.resizeColumnsToContents()
+        self.table_failure = QTableView(self)
         left_column_layout.addWidget(self.table_failure)
 
         # Success Table
@@ -154,7 +231,7 @@ class App(QMainWindow):
         success_button_layout.addWidget(self.load_success_button)
 
         self.add_row_success_button = QPushButton("Add Row", self)
-        self.add_row_success_button.clicked.connect(lambda: self.add_row(self.table_success, self.database.success_data))
+        self.add_row_success_button.clicked.connect(lambda: self.add_row(self.table_success, 'success'))
         success_button_layout.addWidget(self.add_row_success_button)
 
         self.save_success_button = QPushButton("Save Success Rates", self)
@@ -162,28 +239,33 @@ class App(QMainWindow):
         success_button_layout.addWidget(self.save_success_button)
         left_column_layout.addLayout(success_button_layout)
 
-        self.table_success = QTableWidget(self)
-        self.table_success.resizeColumnsToContents()
+        self.table_success = QTableView(self)
         left_column_layout.addWidget(self.table_success)
 
         layout.addLayout(left_column_layout, 0, 0)
 
-        # Initialize with an empty plot
-        self.init_plot_canvas()
+        # Progress of background jobs
+        self.job_label = QLabel(self)
+        self.job_progress = QProgressBar(self)
+        self.cancel_job_button = QPushButton("Cancel", self)
+        self.cancel_job_button.clicked.connect(self.cancel_job)
+        for widget in (self.job_label, self.job_progress, self.cancel_job_button):
+            self.statusBar().addPermanentWidget(widget)
+            widget.hide()
+
+        # Timings of the last load, update, chart and table display
+        self.timing_label = TimingLabel(recorder, self)
+        self.statusBar().addWidget(self.timing_label)
+
+        QShortcut(QKeySequence("Ctrl+Z"), self, self.undo_edit)
+        QShortcut(QKeySequence("Ctrl+Y"), self, self.redo_edit)
+        self.export_trace_button = QPushButton("Export Timings", self)
+        self.export_trace_button.setToolTip("Save the recorded timings as a Chrome trace JSON file")
+        self.export_trace_button.clicked.connect(self.export_timings)
+        self.statusBar().addPermanentWidget(self.export_trace_button)
 
         self.show()
 
-        # Connect table item change events
-        self.table_stock.itemChanged.connect(lambda item: self.update_temp_data_from_item(item, self.table_stock))
-        self.table_failure.itemChanged.connect(lambda item: self.update_temp_data_from_item(item, self.table_failure))
-        self.table_success.itemChanged.connect(lambda item: self.update_temp_data_from_item(item, self.table_success))
-
-    def init_plot_canvas(self):
-        """Initializes the plot canvas with an empty plot."""
-        self.current_fig = Figure()
-        self.plot_canvas = FigureCanvas(self.current_fig)
-        self.plot_frame.layout().addWidget(self.plot_canvas)
-
     def validate_years(self):
         """Validates the input years for correct format and existence."""
         if not self.start_year_entry.text() or not self.end_year_entry.text():
@@ -199,43 +281,50 @@ class App(QMainWindow):
             return None, None
 
     def load_data(self, data_type):
-        """Loads data from a CSV file based on the type (stock, failure, success)."""
+        """Loads data from a CSV file based on the type (stock, failure, success) in the background."""
         file_path, _ = QFileDialog.getOpenFileName(self, 'Open file', '', 'CSV files (*.csv)')
         if file_path:
             if data_type == 'stock':
                 self.stock_file_path = file_path
-                self.database.load_stock_data(file_path)
-                self.display_data_in_table(self.database.stock_data, self.table_stock)
+                load, table = self.database.load_stock_data, self.table_stock
             elif data_type == 'failure':
                 self.failure_file_path = file_path
-                self.database.load_failure_rates(file_path)
-                self.display_data_in_table(self.database.failure_data, self.table_failure)
+                load, table = self.database.load_failure_rates, self.table_failure
             elif data_type == 'success':
                 self.success_file_path = file_path
-                self.database.load_success_rates(file_path)
-                self.display_data_in_table(self.database.success_data, self.table_success)
-
-    def update_stock(self):
-        """Updates the stock data and displays the updated data in the table."""
-        try:
-            start_year, end_year = self.validate_years()
-            if start_year is None or end_year is None:
+                load, table = self.database.load_success_rates, self.table_success
+            else:
                 return
+            self.run_job(Job(lambda job: load(file_path)), f"Loading {data_type} data...",
+                         lambda data: self.display_data_in_table(data, table))
 
-            # Clear the changed table stock before updating
-            self.changed_table_stock.clearContents()
-            self.changed_table_stock.setRowCount(0)
-            self.changed_table_stock.setColumnCount(0)
-
-            if self.database.stock_data is not None and self.database.failure_data is not None and self.database.success_data is not None:
-                self.stock_manager = StockManager(self.database)
-                updated_stock_data = self.stock_manager.update_stock(start_year, end_year)
-
-                self.database.stock_data_changed = updated_stock_data  # Save the updated stock data
-                self.display_data_in_table(updated_stock_data, self.changed_table_stock)
-                self.update_failure_and_success_rates()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred: {e}")
+    def update_stock(self):
+        """Updates the stock data in the background and displays the updated data in the table."""
+        start_year, end_year = self.validate_years()
+        if start_year is None or end_year is None:
+            return
+
+        if self.database.stock_data is not None and self.database.failure_data is not None and self.database.success_data is not None:
+            self.stock_manager.key = self.match_key_entry.text().strip() or None
+            # Only rows edited since the last update are re-projected when the tables and years are unchanged
+            job = Job(lambda job: self.stock_manager.update_stock_incremental(
+                start_year, end_year, progress=job.report_progress))
+            self.run_job(job, "Updating stock...", self.show_updated_stock, cancellable=True)
+
+    def show_updated_stock(self, updated_stock_data):
+        """Displays the result of a stock update."""
+        self.database.stock_data_changed = updated_stock_data  # Save the updated stock data
+        model = self.changed_table_stock.model()
+        if model is not None and model.data_frame is updated_stock_data:
+            model.refresh()  # Patched in place by an incremental update
+        else:
+            self.display_data_in_table(updated_stock_data, self.changed_table_stock)
+        self.update_failure_and_success_rates()
+        alignment = self.stock_manager.alignment
+        if alignment is not None and alignment.key is not None and not alignment.complete:
+            QMessageBox.warning(self, "Unmatched Rows",
+                                "These rows were not projected:\n" + alignment.describe(
+                                    self.database.stock_data, self.database.failure_data, self.database.success_data))
 
     def update_failure_and_success_rates(self):
         """Updates the failure and success rates data in the respective tables."""
@@ -246,34 +335,130 @@ class App(QMainWindow):
             self.display_data_in_table(self.database.success_data, self.table_success)
 
     def plot_value_change(self):
-        """Generates and displays a plot showing the change in stock values."""
-        try:
-            start_year, end_year = self.validate_years()
-            if start_year is None or end_year is None:
-                return
-
-            if self.database:
-                self.plotter = Plotter(self.database)
-                fig = self.plotter.plot_value_change(start_year, end_year)
-                self.current_fig = fig
-                self.display_plot_in_canvas(fig)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred: {e}")
+        """Generates the plot showing the change in stock values in the background and displays it."""
+        start_year, end_year = self.validate_years()
+        if start_year is None or end_year is None:
+            return
+
+        if self.database:
+            if self.plotter is None:
+                from controllers.plotter import Plotter
+                self.plotter = Plotter(self.database, self.result_cache)
+            top_n = self.top_sources_entry.value()
+            if self.fast_chart_entry.isChecked():
+                # Only the data is prepared in the background; drawing on the reused figure is quick
+                self.run_job(Job(lambda job: self.plotter.value_change_data(start_year, end_year, top_n=top_n)),
+                             "Generating chart...", lambda data: self.show_plot(self.plotter.draw_value_change(data)))
+            else:
+                self.run_job(Job(lambda job: self.plotter.plot_value_change(start_year, end_year, top_n=top_n)),
+                             "Generating chart...", self.show_plot)
+
+    def show_plot(self, fig):
+        """Displays a generated chart."""
+        self.current_fig = fig
+        self.display_plot_in_canvas(fig)
+
+    def run_job(self, job, description, on_result, cancellable=False):
+        """Runs a job on the thread pool; the window stays responsive and on_result gets its result.
+
+        Only cancellable jobs, which pass job.report_progress to their work, show the Cancel button;
+        the others (like loads, which assign the table to the database as they finish) always complete.
+        """
+        self.current_job = job
+        self.current_job_cancellable = cancellable
+        job.signals.progress.connect(self.show_job_progress)
+        job.signals.result.connect(on_result)
+        job.signals.error.connect(self.show_job_error)
+        job.signals.finished.connect(lambda: self.finish_job(job))
+
+        self.centralWidget().setEnabled(False)
+        self.job_label.setText(description)
+        self.job_progress.setRange(0, 0)  # Busy indicator until the job reports progress
+        for widget in (self.job_label, self.job_progress):
+            widget.show()
+        self.cancel_job_button.setVisible(cancellable)
+        QThreadPool.globalInstance().start(job)
+
+    def show_job_progress(self, done, total):
+        """Shows the progress reported by the running job."""
+        self.job_progress.setRange(0, total)
+        self.job_progress.setValue(done)
+
+    def show_job_error(self, error):
+        """Reports a failed job."""
+        from controllers.plotter import MissingDataError
+        if isinstance(error, MissingDataError):
+            QMessageBox.warning(self, "Missing Data", str(error))
+        else:
+            QMessageBox.critical(self, "Error", f"An error occurred: {error}")
+
+    def cancel_job(self):
+        """Cancels the running job."""
+        if self.current_job is not None and self.current_job_cancellable:
+            self.current_job.cancel()
+            self.job_label.setText("Cancelling...")
+
+    def finish_job(self, job):
+        """Restores the window once a job is done."""
+        if job is not self.current_job:
+            return
+        self.current_job = None
+        self.centralWidget().setEnabled(True)
+        for widget in (self.job_label, self.job_progress, self.cancel_job_button):
+            widget.hide()
+
+    def closeEvent(self, event):
+        """Cancels the running job and removes the autosave before the window closes."""
+        self.cancel_job()
+        QThreadPool.globalInstance().waitForDone()
+        if self._database is not None:
+            self._database.autosave.discard()  # A normal close leaves nothing to restore
+            self._database.autosave.close()
+        super().closeEvent(event)
+
+    def offer_autosave_restore(self):
+        """Offers to restore the tables and edits autosaved by a session that did not close normally."""
+        from models.autosave import previous_sessions
+
+        sessions = previous_sessions(AUTOSAVE_DIR)
+        if not sessions:
+            return
+        answer = QMessageBox.question(self, "Restore Autosave",
+                                      "The previous session did not close normally. Restore its tables and edits?")
+        for directory in sessions[1:] if answer == QMessageBox.Yes else sessions:
+            shutil.rmtree(directory, ignore_errors=True)
+        if answer == QMessageBox.Yes:
+            self.run_job(Job(lambda job: self.database.restore_autosave(sessions[0])), "Restoring autosave...",
+                         self.show_restored_data)
+
+    def show_restored_data(self, sources):
+        """Displays the tables restored from the autosave."""
+        for data_type, table in (('stock', self.table_stock), ('failure', self.table_failure),
+                                 ('success', self.table_success)):
+            if data_type in sources:
+                setattr(self, f'{data_type}_file_path', sources[data_type])
+                self.display_data_in_table(getattr(self.database, f'{data_type}_data'), table)
 
     def display_data_in_table(self, data, table):
-        """Displays the given data in the specified table widget."""
-        table.setRowCount(data.shape[0])
-        table.setColumnCount(data.shape[1])
-        table.setHorizontalHeaderLabels(data.columns)
-
-        for i in range(data.shape[0]):
-            for j in range(data.shape[1]):
-                table.setItem(i, j, QTableWidgetItem(str(data.iat[i, j])))
-
-        table.resizeColumnsToContents()  # Automatically adjust column widths
-
+        """Displays the given data in the specified table view."""
+        with recorder.span('App.display_data_in_table', rows=len(data)):
+            model = table.model()
+            if model is None:
+                model = DataFrameModel(data, editable=table is not self.changed_table_stock, parent=table)
+                model.cellEdited.connect(
+                    lambda row, column, value: self.update_temp_data_from_item(table, row, column, value))
+                table.setModel(model)
+            else:
+                model.set_data_frame(data)  # The old frame is released, not kept by a model left behind
+            table.resizeColumnsToContents()  # Automatically adjust column widths, measured on the visible rows
+
+    @instrumented('App.display_plot_in_canvas')
     def display_plot_in_canvas(self, fig):
-        """Displays the given plot figure in the plot frame."""
+        """Displays the given plot figure in the plot frame, reusing the canvas when it already shows fig."""
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        if getattr(self, 'plot_canvas', None) is not None and self.plot_canvas.figure is fig:
+            self.plot_canvas.draw_idle()
+            return
         for i in reversed(range(self.plot_frame.layout().count())):
             self.plot_frame.layout().itemAt(i).widget().setParent(None)
         self.plot_canvas = FigureCanvas(fig)
@@ -289,9 +474,24 @@ class App(QMainWindow):
         else:
             QMessageBox.warning(self, "Warning", "No chart available to save")
 
+    def export_timings(self):
+        """Saves the recorded timings as a Chrome trace JSON file."""
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Export Timings', '', 'JSON files (*.json)')
+        if file_path:
+            recorder.export_chrome_trace(file_path)
+            QMessageBox.information(self, "Success", f"Timings saved to {file_path}")
+
+    def table_save_path(self, title):
+        """Asks for the file a table is saved to; the format follows its extension or the chosen file type."""
+        file_path, file_filter = QFileDialog.getSaveFileName(
+            self, title, '', 'CSV files (*.csv);;Parquet files (*.parquet);;Feather files (*.feather)')
+        if file_path and not os.path.splitext(file_path)[1]:
+            file_path += file_filter[file_filter.index('*') + 1:-1]
+        return file_path
+
     def save_data(self, data_type):
-        """Saves the data of the specified type (stock, failure, success) to a CSV file."""
-        file_path, _ = QFileDialog.getSaveFileName(self, 'Save File', '', 'CSV files (*.csv)')
+        """Saves the data of the specified type (stock, failure, success) to a CSV, Parquet or Feather file."""
+        file_path = self.table_save_path('Save File')
         if file_path:
             if data_type == 'stock':
                 self.database.save_stock_data(self.database.stock_data, file_path)
@@ -302,55 +502,75 @@ class App(QMainWindow):
             QMessageBox.information(self, "Success", f"{data_type.capitalize()} data saved to {file_path}")
 
     def save_updated_stock_data(self):
-        """Saves the updated stock data to a CSV file."""
-        file_path, _ = QFileDialog.getSaveFileName(self, 'Save Updated Stock Data', '', 'CSV files (*.csv)')
+        """Saves the updated stock data to a CSV, Parquet or Feather file."""
+        file_path = self.table_save_path('Save Updated Stock Data')
         if file_path and self.database.stock_data_changed is not None:
             self.database.save_stock_data(self.database.stock_data_changed, file_path)
             QMessageBox.information(self, "Success", f"Updated stock data saved to {file_path}")
         else:
             QMessageBox.warning(self, "Warning", "No updated stock data available to save")
 
-    def add_row(self, table, dataframe):
+    def add_row(self, table, data_type):
         """Adds a new row to the specified table and the corresponding dataframe."""
-        row_position = table.rowCount()
-        table.insertRow(row_position)
-        dataframe.loc[row_position] = [0] * dataframe.shape[1]
+        if table.model() is not None:
+            columns = getattr(self.database, f'{data_type}_data').shape[1]
+            table.model().append_row([0] * columns, lambda values: self.database.append_row(data_type, values))
 
     def add_column_to_stock_data(self):
         """Adds a new column to the stock data and updates the table."""
         column_name, ok = QtWidgets.QInputDialog.getText(self, "Add Column", "Enter column name:")
         if ok and column_name:
-            self.database.stock_data[column_name] = 0
+            self.database.add_column('stock', column_name)
             self.display_data_in_table(self.database.stock_data, self.table_stock)
 
-    def update_temp_data_from_item(self, item, table):
-        """Updates the temporary data in the dataframe when a table item is changed."""
-        row = item.row()
-        column = item.column()
-        new_value = item.text()
+    def undo_edit(self):
+        """Reverts the last cell edit of the tables."""
+        if self._database is not None and self.current_job is None:
+            self.show_edited_cell(self.database.undo())
+
+    def redo_edit(self):
+        """Writes the last undone cell edit again."""
+        if self._database is not None and self.current_job is None:
+            self.show_edited_cell(self.database.redo())
+
+    def show_edited_cell(self, change):
+        """Redraws and selects the cell changed by an undo or redo."""
+        if change is None:
+            return
+        data_type, row, column = change
+        table = {'stock': self.table_stock, 'failure': self.table_failure, 'success': self.table_success}[data_type]
+        if table.model() is not None:
+            index = table.model().index(row, column)
+            table.model().dataChanged.emit(index, index)
+            table.setCurrentIndex(index)
+
+    def show_changes(self):
+        """Shows the cells whose value differs from the loaded files."""
+        lines = []
+        for data_type in ('stock', 'failure', 'success'):
+            if getattr(self.database, f'{data_type}_data') is not None:
+                for cell in self.database.changed_cells(data_type).itertuples(index=False):
+                    lines.append(f"{data_type} row {cell.Row + 1}, {cell.Column}: {cell.Loaded} -> {cell.Current}")
+        message = QMessageBox(QMessageBox.Information, "Changes",
+                              f"{len(lines)} cells differ from the loaded files." if lines else "No cells were changed.",
+                              parent=self)
+        if lines:
+            message.setDetailedText('\n'.join(lines))
+        message.exec_()
+
+    def update_temp_data_from_item(self, table, row, column, new_value):
+        """Updates the temporary data in the dataframe when a table cell is edited."""
         try:
             new_value = float(new_value)
         except ValueError:
             pass
 
         if table == self.table_stock:
-            self.database.stock_data.iat[row, column] = new_value
+            self.database.set_cell('stock', row, column, new_value)
         elif table == self.table_failure:
-            self.database.failure_data.iat[row, column] = new_value
+            self.database.set_cell('failure', row, column, new_value)
         elif table == self.table_success:
-            self.database.success_data.iat[row, column] = new_value
-
-    def update_temp_data_from_table(self, table, dataframe):
-        """Updates the dataframe with the current values from the table."""
-        for row in range(table.rowCount()):
-            for column in range(table.columnCount()):
-                item = table.item(row, column)
-                if item is not None:
-                    value = item.text()
-                    try:
-                        dataframe.iat[row, column] = float(value)
-                    except ValueError:
-                        dataframe.iat[row, column] = value
+            self.database.set_cell('success', row, column, new_value)
 
 
 if __name__ == '__main__':
@@ -9,6 +9,7 @@ a = Analysis(
         ('views/*', 'views'),
         ('models/*', 'models'),
         ('controllers/*', 'controllers'),
+        ('utils/*', 'utils'),
     ],
     hiddenimports=[
     'tkinter', 'tkinter.ttk', 'tkinter.filedialog', 'tkinter.messagebox',
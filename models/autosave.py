@@ -0,0 +1,280 @@
+"""Write-behind persistence of the loaded tables and their edits.
+
+The snapshot of a freshly loaded table only points at its source file, so loading
+costs no copy and no write of the table. The first journaled edit of a table replaces
+that pointer with a full snapshot, read back from the source (or its binary cache),
+so saving over the source later does not lose the edits, as long as the queue is
+flushed before (Database.save_frames() does). Every edit is queued and
+appended by a background thread to the journal of its table, so the GUI thread never
+waits for a disk write. After compact_every journal entries the thread replays them
+into a full snapshot, pickled straight into a temporary file that is renamed over the
+old one, and empties the journal. Snapshots remember the last entry they include, so
+a crash at any point loses at most the edits still in the queue, and recover()
+rebuilds the tables from the latest snapshot and the journal after it.
+Each session writes to its own directory, named after its process ID, so
+previous_sessions() finds the ones left by an app that did not close normally.
+
+pandas is only imported by the functions needing it, as the GUI checks for a
+previous session before pandas is loaded.
+"""
+import json
+import os
+import pickle
+import queue
+import shutil
+import threading
+
+DATA_TYPES = ('stock', 'failure', 'success')
+
+
+class Autosave:
+    """Journals table edits to a directory on a background thread."""
+
+    def __init__(self, directory, compact_every=10000):
+        self.directory = directory
+        self.compact_every = compact_every
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._pending = {}  # data_type -> journal entries since its snapshot
+        self._readers = {}  # data_type -> read_table of its source, for compaction
+        self._full = set()  # data_types whose snapshot holds the table rather than pointing at its source
+        self._thread = threading.Thread(target=self._run, name='Autosave', daemon=True)
+        self._thread.start()
+
+    def track(self, data_type, source, read_table, data=None):
+        """Starts journaling a table loaded from source; its earlier snapshot and journal are dropped.
+
+        The snapshot points at source, which read_table(source) reads back as it was loaded.
+        A table that differs from its source (like a restored one) is passed as data and
+        written in full instead; it must not be edited until flush() returned.
+        """
+        with self._lock:
+            self._queue.put(('track', data_type, source, source_stat(source), read_table, data, self._sequence))
+
+    def record(self, data_type, operation, **entry):
+        """Queues an edit of a tracked table, applied by apply_entry() on recovery.
+
+        operation is 'cell' (row, column, value), 'row' (values) or 'column' (column, value).
+        """
+        with self._lock:
+            self._sequence += 1
+            entry = dict(entry, sequence=self._sequence, operation=operation)
+            self._queue.put(('edit', data_type, entry))
+
+    def discard(self):
+        """Deletes the directory with the snapshots and journals, once the queued work before it is done."""
+        self._queue.put(('discard',))
+
+    def flush(self):
+        """Blocks until every queued snapshot and edit is on disk."""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait()
+
+    def close(self):
+        """Writes the queued edits and stops the background thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        """Background thread: writes queued work in batches, compacting journals that grew long."""
+        while True:
+            items = [self._queue.get()]
+            while not self._queue.empty():
+                items.append(self._queue.get())
+            entries = {}
+            for item in items:
+                try:
+                    if item is None or item[0] in ('track', 'discard', 'flush'):
+                        self._write_entries(entries)
+                        entries = {}
+                    if item is None:
+                        return
+                    if item[0] == 'track':
+                        _, data_type, source, stat, read_table, data, sequence = item
+                        os.makedirs(self.directory, exist_ok=True)
+                        self._write_snapshot(data_type, {'source': source, 'stat': stat, 'sequence': sequence,
+                                                         'data': data})
+                        self._replace(journal_path(self.directory, data_type))
+                        self._pending[data_type] = 0
+                        self._readers[data_type] = read_table
+                        if data is None:
+                            self._full.discard(data_type)
+                        else:
+                            self._full.add(data_type)
+                    elif item[0] == 'edit':
+                        entries.setdefault(item[1], []).append(item[2])
+                    elif item[0] == 'discard':
+                        shutil.rmtree(self.directory, ignore_errors=True)
+                        self._pending.clear()
+                        self._full.clear()
+                    elif item[0] == 'flush':
+                        item[1].set()
+                except Exception as e:
+                    print(f"Autosave failed: {e}")
+            try:
+                self._write_entries(entries)
+            except Exception as e:
+                print(f"Autosave failed: {e}")
+
+    def _write_entries(self, entries):
+        """Appends the entries of every table to its journal and compacts the journals that grew long."""
+        for data_type, table_entries in entries.items():
+            if data_type not in self._pending:
+                continue  # Not tracked, there is no snapshot to replay the edits on
+            with open(journal_path(self.directory, data_type), 'a', encoding='utf-8') as journal:
+                journal.writelines(json.dumps(entry, default=plain_value) + '\n' for entry in table_entries)
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._pending[data_type] += len(table_entries)
+            if data_type not in self._full or self._pending[data_type] >= self.compact_every:
+                self._compact(data_type)
+
+    def _compact(self, data_type):
+        """Replays the journal into a full snapshot, then empties the journal."""
+        snapshot = read_snapshot(self.directory, data_type)
+        data = snapshot_data(snapshot, self._readers[data_type])
+        if data is None:
+            return  # The source changed on disk; the journal keeps growing rather than replaying on other data
+        for entry in read_journal(self.directory, data_type):
+            if entry['sequence'] > snapshot['sequence']:
+                apply_entry(data, entry)
+                snapshot['sequence'] = entry['sequence']
+        snapshot['data'] = data
+        self._write_snapshot(data_type, snapshot)
+        self._replace(journal_path(self.directory, data_type))
+        self._pending[data_type] = 0
+        self._full.add(data_type)
+
+    def _write_snapshot(self, data_type, snapshot):
+        """Atomically replaces the snapshot of a table, pickling it straight into the file."""
+        self._replace(snapshot_path(self.directory, data_type),
+                      lambda snapshot_file: pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _replace(self, path, write=None):
+        """Writes a temporary file with write(file), or empty without it, and renames it over path.
+
+        path is never half written.
+        """
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as temp_file:
+            if write is not None:
+                write(temp_file)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+
+
+def previous_sessions(root):
+    """Returns the session directories under root with tables left by processes no longer running, newest first."""
+    sessions = []
+    for name in (os.listdir(root) if os.path.isdir(root) else []):
+        directory = os.path.join(root, name)
+        if (name.isdigit() and int(name) != os.getpid() and not process_running(int(name))
+                and has_snapshots(directory)):
+            sessions.append(directory)
+    return sorted(sessions, key=os.path.getmtime, reverse=True)
+
+
+def process_running(pid):
+    """Tells whether a process with the ID runs; without psutil every other session counts as ended."""
+    try:
+        import psutil
+    except ImportError:
+        return False
+    return psutil.pid_exists(pid)
+
+
+def has_snapshots(directory):
+    """Tells whether directory holds tables of a session that recover() can rebuild."""
+    return any(os.path.exists(snapshot_path(directory, data_type)) for data_type in DATA_TYPES)
+
+
+def recover(directory, read_table):
+    """Returns {data_type: (table, source file)} rebuilt from the snapshots and journals in directory.
+
+    read_table(source) reads the tables whose snapshot points at their source file. Tables
+    whose source changed on disk since they were loaded are left out, with a warning.
+    """
+    tables = {}
+    for data_type in DATA_TYPES:
+        snapshot = read_snapshot(directory, data_type)
+        if snapshot is not None:
+            data = snapshot_data(snapshot, read_table)
+            if data is None:
+                print(f"Autosave: {snapshot['source']} changed since it was loaded, its {data_type} edits are lost.")
+                continue
+            for entry in read_journal(directory, data_type):
+                if entry['sequence'] > snapshot['sequence']:
+                    apply_entry(data, entry)
+            tables[data_type] = (data, snapshot['source'])
+    return tables
+
+
+def snapshot_data(snapshot, read_table):
+    """Returns the table of a snapshot, read from its source when it only points at it; None if that changed."""
+    if snapshot['data'] is not None:
+        return snapshot['data']
+    if source_stat(snapshot['source']) != snapshot['stat']:
+        return None
+    return read_table(snapshot['source'])
+
+
+def source_stat(file_path):
+    """Returns the size and modification time telling whether a source file changed, or None without it."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_snapshot(directory, data_type):
+    """Returns the snapshot dictionary of a table, or None without one."""
+    try:
+        with open(snapshot_path(directory, data_type), 'rb') as snapshot_file:
+            return pickle.load(snapshot_file)
+    except FileNotFoundError:
+        return None
+
+
+def read_journal(directory, data_type):
+    """Returns the journal entries of a table; a line cut short by a crash ends the journal."""
+    entries = []
+    try:
+        with open(journal_path(directory, data_type), encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def snapshot_path(directory, data_type):
+    return os.path.join(directory, f'{data_type}.snapshot')
+
+
+def journal_path(directory, data_type):
+    return os.path.join(directory, f'{data_type}.journal')
+
+
+def plain_value(value):
+    """json.dumps fallback turning numpy scalars into the Python numbers they hold."""
+    return value.item()
+
+
+def apply_entry(data, entry):
+    """Applies a journal entry of Autosave.record() to a table in place."""
+    from models.compact import make_room
+
+    if entry['operation'] == 'cell':
+        column = entry['column']
+        data.iat[entry['row'], data.columns.get_loc(column)] = make_room(data, column, entry['value'])
+    elif entry['operation'] == 'row':
+        data.loc[len(data)] = entry['values']
+    elif entry['operation'] == 'column':
+        data[entry['column']] = entry['value']
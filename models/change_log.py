@@ -0,0 +1,60 @@
+class ChangeLog:
+    """Undo and redo history of the edited cells of the tables.
+
+    Every edit is kept as a (data_type, row, column, old, new) delta, so the memory grows
+    with the number of edits rather than with the size of the tables. The changes before
+    position are applied; the ones after it were undone and are redone by redo(), until
+    a new edit drops them.
+    """
+
+    def __init__(self):
+        self.changes = []
+        self.position = 0
+
+    def record(self, data_type, row, column, old, new):
+        """Adds an edit of the cell at the row and column positions of a table."""
+        del self.changes[self.position:]
+        self.changes.append((data_type, row, column, old, new))
+        self.position += 1
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.changes)
+
+    def undo(self):
+        """Steps back over the last applied change and returns it, or None without one."""
+        if not self.can_undo:
+            return None
+        self.position -= 1
+        return self.changes[self.position]
+
+    def redo(self):
+        """Steps forward over the last undone change and returns it, or None without one."""
+        if not self.can_redo:
+            return None
+        self.position += 1
+        return self.changes[self.position - 1]
+
+    def forget(self, data_type):
+        """Drops the changes of a table, as when it is loaded again."""
+        kept_before = [change for change in self.changes[:self.position] if change[0] != data_type]
+        kept_after = [change for change in self.changes[self.position:] if change[0] != data_type]
+        self.changes = kept_before + kept_after
+        self.position = len(kept_before)
+
+    def diff(self, data_type):
+        """Returns {(row, column): (loaded, current)} for the cells of a table the applied changes left different."""
+        cells = {}
+        for changed_type, row, column, old, new in self.changes[:self.position]:
+            if changed_type == data_type:
+                cells[row, column] = (cells.get((row, column), (old,))[0], new)
+        return {cell: values for cell, values in cells.items() if not same_value(*values)}
+
+
+def same_value(first, second):
+    """Tells whether two cell values are equal, taking two NaNs as equal."""
+    return first == second or (first != first and second != second)
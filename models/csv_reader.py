@@ -0,0 +1,69 @@
+"""Readers for the semicolon separated CSV files of the app.
+
+The 'pandas' engine is pandas' single-threaded C parser. The 'pyarrow' engine parses
+blocks of the file on all cores with the pyarrow CSV reader and converts the result to
+the same DataFrame pandas would give: same column names, dtypes, missing values and
+strings. Files pyarrow cannot read (like rows with missing fields) and missing pyarrow
+fall back to the pandas engine.
+"""
+import numpy as np
+import pandas as pd
+
+ENGINES = ('pandas', 'pyarrow')
+
+# The strings pandas reads as missing values, and as booleans
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>',
+             'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+TRUE_VALUES = ['True', 'TRUE', 'true']
+FALSE_VALUES = ['False', 'FALSE', 'false']
+
+
+def read_csv(file_path, engine='pandas', decimal='.'):
+    """Reads a whole semicolon CSV file with the given engine; decimal is the decimal separator."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}', expected one of {', '.join(ENGINES)}.")
+    if engine == 'pyarrow':
+        try:
+            return read_csv_pyarrow(file_path, decimal)
+        except ImportError:
+            print("pyarrow is not installed, reading the CSV file with pandas.")
+        except Exception as e:
+            if type(e).__name__ != 'ArrowInvalid':
+                raise
+            print(f"pyarrow could not read {file_path} ({e}), reading it with pandas.")
+    return pd.read_csv(file_path, sep=';', decimal=decimal)
+
+
+def read_csv_pyarrow(file_path, decimal='.'):
+    """Reads a semicolon CSV file with the multithreaded pyarrow reader into the DataFrame pandas would read."""
+    import pyarrow as pa
+    from pyarrow import csv
+
+    # pandas names the columns, so repeated names get the same '.1' suffixes
+    header = pd.read_csv(file_path, sep=';', nrows=0)
+    read_options = csv.ReadOptions(column_names=[str(name) for name in header.columns], skip_rows=1)
+    parse_options = csv.ParseOptions(delimiter=';')
+
+    def read(column_types=None):
+        convert_options = csv.ConvertOptions(
+            column_types=column_types, null_values=NA_VALUES, true_values=TRUE_VALUES, false_values=FALSE_VALUES,
+            strings_can_be_null=True, decimal_point=decimal, timestamp_parsers=[])
+        return csv.read_csv(file_path, read_options, parse_options, convert_options)
+
+    table = read()
+    if not table.num_rows:
+        return header  # pandas gives object columns without rows
+    # pandas keeps dates and times as text; read those columns again as strings
+    temporal = {field.name: pa.string() for field in table.schema if pa.types.is_temporal(field.type)}
+    if temporal:
+        table = read(temporal)
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        # A column without any value is float64 NaN in pandas
+        columns.append(column.cast(pa.float64()) if pa.types.is_null(field.type) else column)
+    data = pa.Table.from_arrays(columns, names=table.column_names).to_pandas()
+    data.columns = header.columns
+    for j, column in enumerate(columns):
+        if column.null_count and data.dtypes.iloc[j] == object:
+            data.isetitem(j, data.iloc[:, j].fillna(np.nan))  # Missing text is NaN in pandas, not None
+    return data
@@ -1,38 +1,235 @@
+import os
+import shutil
+
+import numpy as np
 import pandas as pd
 
+from models.autosave import recover
+from models.change_log import ChangeLog, same_value
+from models.compact import cell_value, compact_table, make_room
+from models.csv_reader import read_csv
+from models.mapped_table import MappedTable
+from models.table_cache import TableCache
+from models.table_writer import output_format, write_binary, write_csv
+from utils.instrumentation import instrumented
+
 class Database:
-    def __init__(self):
+    def __init__(self, use_cache=True, storage_dir=None, storage_dtype=np.float64, compact=False,
+                 csv_engine='pandas', decimal='.', autosave=None):
+        """With a storage_dir, tables are loaded as MappedTables whose year columns are
+        memory-mapped storage_dtype arrays in that directory instead of DataFrames.
+        With compact, DataFrames get the narrow column types of compact_table(), which
+        take a half to a quarter of the memory and project to the same results.
+        csv_engine picks the parser of whole files ('pandas' or the multithreaded 'pyarrow',
+        see models.csv_reader) and decimal is the decimal separator of the CSV files.
+        autosave is an optional models.autosave.Autosave that keeps the loaded tables and
+        every edit on disk, so restore_autosave() can bring them back after a crash."""
+        self.use_cache = use_cache
+        self.compact = compact
+        self.csv_engine = csv_engine
+        self.decimal = decimal
+        self.storage_dir = storage_dir
+        self.storage_dtype = storage_dtype
+        self.autosave = autosave
         self.stock_data = None
         self.failure_data = None
         self.success_data = None
         self.stock_data_changed = None
+        # Edited row -> earliest edited year (-inf when the whole row must be re-projected)
+        self.dirty_rows = {}
+        self.changes = ChangeLog()  # Cell edits since each table was loaded, for undo, redo and changed_cells()
 
+    @instrumented('Database.load_stock_data', rows=len)
     def load_stock_data(self, file_path):
         """Loads stock data from a CSV file."""
-        self.stock_data = pd.read_csv(file_path, sep=';').fillna(0)
+        self.stock_data = self._read_table(file_path, 'stock')
         return self.stock_data
 
+    @instrumented('Database.load_failure_rates', rows=len)
     def load_failure_rates(self, file_path):
         """Loads failure rates data from a CSV file."""
-        self.failure_data = pd.read_csv(file_path, sep=';').fillna(0)
+        self.failure_data = self._read_table(file_path, 'failure')
         return self.failure_data
 
+    @instrumented('Database.load_success_rates', rows=len)
     def load_success_rates(self, file_path):
         """Loads success rates data from a CSV file."""
-        self.success_data = pd.read_csv(file_path, sep=';').fillna(0)
+        self.success_data = self._read_table(file_path, 'success')
         return self.success_data
 
-    def save_stock_data(self, stock_data, output_file):
-        """Saves stock data to a CSV file."""
-        stock_data.to_csv(output_file, sep=';', index=False)
+    def set_cell(self, data_type, row, column, value):
+        """Writes an edited cell of the stock, failure or success table, logs the change and marks its row dirty."""
+        old = cell_value(getattr(self, f'{data_type}_data'), row, column)
+        if not same_value(old, value):  # Leaving a cell editor unchanged is nothing to undo
+            self.changes.record(data_type, row, column, old, value)
+        self._write_cell(data_type, row, column, value)
+
+    def undo(self):
+        """Reverts the last cell edit; returns its (data_type, row, column), or None without one."""
+        change = self.changes.undo()
+        if change is None:
+            return None
+        data_type, row, column, old, _ = change
+        self._write_cell(data_type, row, column, old)
+        return data_type, row, column
+
+    def redo(self):
+        """Writes the last undone cell edit again; returns its (data_type, row, column), or None without one."""
+        change = self.changes.redo()
+        if change is None:
+            return None
+        data_type, row, column, _, new = change
+        self._write_cell(data_type, row, column, new)
+        return data_type, row, column
+
+    def changed_cells(self, data_type):
+        """Returns the edited cells of a table whose value differs from the loaded file.
+
+        The DataFrame has Row (position), Column, Loaded and Current columns, read from the
+        change log; added rows and columns are not listed.
+        """
+        data = getattr(self, f'{data_type}_data')
+        cells = sorted(self.changes.diff(data_type).items())
+        return pd.DataFrame({
+            'Row': [row for (row, _), _ in cells],
+            'Column': [data.columns[column] for (_, column), _ in cells],
+            'Loaded': pd.Series([loaded for _, (loaded, _) in cells], dtype=object),
+            'Current': pd.Series([current for _, (_, current) in cells], dtype=object),
+        })
+
+    def _write_cell(self, data_type, row, column, value):
+        """Writes a cell and marks its row dirty, without logging the change."""
+        data = getattr(self, f'{data_type}_data')
+        if self.autosave is not None:
+            self.autosave.record(data_type, 'cell', row=row, column=data.columns[column], value=value)
+        value = make_room(data, data.columns[column], value)
+        data.iat[row, column] = value
+        column_name = str(data.columns[column])
+        if column_name.isdigit() and not (data_type == 'stock' and column_name == '2023'):
+            dirty_year = int(column_name)
+        else:
+            dirty_year = float('-inf')  # The base stock or a non-year column affects the whole row
+        self.dirty_rows[row] = min(self.dirty_rows.get(row, dirty_year), dirty_year)
+
+    def append_row(self, data_type, values):
+        """Appends a row to the stock, failure or success table."""
+        data = getattr(self, f'{data_type}_data')
+        if self.autosave is not None:
+            self.autosave.record(data_type, 'row', values=list(values))
+        data.loc[len(data)] = values
+
+    def add_column(self, data_type, column, value=0):
+        """Adds a column filled with value to the stock, failure or success table."""
+        if self.autosave is not None:
+            self.autosave.record(data_type, 'column', column=column, value=value)
+        getattr(self, f'{data_type}_data')[column] = value
+
+    def restore_autosave(self, directory):
+        """Loads the tables and edits autosaved by an earlier session in directory, then deletes it.
+
+        Returns {data_type: source file} of the restored tables, which this session's autosave takes over.
+        """
+        sources = {}
+        for data_type, (data, source) in recover(directory, self.read_table).items():
+            setattr(self, f'{data_type}_data', data)
+            self.changes.forget(data_type)  # The loaded values of the restored edits are gone
+            self.autosave.track(data_type, source, self.read_table, data)
+            sources[data_type] = source
+        self.stock_data_changed = None
+        self.dirty_rows.clear()
+        self.autosave.flush()  # The tables are in this session's snapshots before the old ones go
+        shutil.rmtree(directory, ignore_errors=True)
+        return sources
+
+    def _read_table(self, file_path, data_type):
+        """Reads a CSV file as a mapped table in storage_dir, or as a DataFrame through read_table."""
+        self.changes.forget(data_type)
+        if self.storage_dir is not None:
+            previous = getattr(self, f'{data_type}_data')
+            if isinstance(previous, MappedTable):
+                previous.close()  # Its backing file is about to be rewritten
+            return MappedTable.from_csv(file_path, self.storage_path(data_type), self.storage_dtype,
+                                        decimal=self.decimal)
+        data = self.read_table(file_path)
+        if self.autosave is not None:
+            self.autosave.track(data_type, file_path, self.read_table)
+        return data
+
+    def read_table(self, file_path):
+        """Reads a CSV file with NaNs filled with 0, from its binary cache when the file is unchanged.
+
+        In compact mode the columns get the narrow types of compact_table().
+        """
+        if not self.use_cache:
+            data = read_csv(file_path, self.csv_engine, self.decimal).fillna(0)
+        else:
+            cache = TableCache(file_path, self.decimal)
+            data = cache.load()
+            if data is None:
+                data = read_csv(file_path, self.csv_engine, self.decimal).fillna(0)
+                cache.store(data)
+        return compact_table(data) if self.compact else data
+
+    def storage_path(self, data_type):
+        """Returns the file backing the mapped table of the given type."""
+        os.makedirs(self.storage_dir, exist_ok=True)
+        return os.path.join(self.storage_dir, f'{data_type}.{np.dtype(self.storage_dtype).name}')
+
+    def read_header(self, file_path):
+        """Reads only the header of a CSV file, as an empty DataFrame."""
+        return pd.read_csv(file_path, sep=';', decimal=self.decimal, nrows=0)
 
+    def read_chunks(self, file_path, chunk_size, dtypes=None):
+        """Yields a CSV file in chunks of chunk_size rows, cast to dtypes and with NaNs filled with 0."""
+        with pd.read_csv(file_path, sep=';', decimal=self.decimal, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                if dtypes is not None:
+                    chunk = chunk.astype(dtypes)
+                yield chunk.fillna(0)
+
+    def scan_dtypes(self, file_path, chunk_size):
+        """Returns the column dtypes a full read of the CSV file would give, reading it chunk by chunk."""
+        dtypes = {}
+        with pd.read_csv(file_path, sep=';', decimal=self.decimal, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                for column, dtype in chunk.dtypes.items():
+                    dtypes[column] = np.result_type(dtypes.get(column, dtype), dtype)
+        return dtypes
+
+    @instrumented('Database.save_stock_data')
+    def save_stock_data(self, stock_data, output_file, append=False):
+        """Saves stock data to a CSV, Parquet or Feather file (after its extension), or appends it to a CSV file."""
+        if isinstance(stock_data, MappedTable):
+            frames = (stock_data.to_frame(start, stop) for start, stop in stock_data.row_chunks(100000))
+        else:
+            frames = [stock_data]
+        self.save_frames(frames, output_file, append)
+
+    @instrumented('Database.save_failure_data')
     def save_failure_data(self, failure_data, output_file):
-        """Saves failure rates data to a CSV file."""
-        failure_data.to_csv(output_file, sep=';', index=False)
+        """Saves failure rates data to a CSV, Parquet or Feather file."""
+        self.save_frames([failure_data], output_file)
 
+    @instrumented('Database.save_success_data')
     def save_success_data(self, success_data, output_file):
-        """Saves success rates data to a CSV file."""
-        success_data.to_csv(output_file, sep=';', index=False)
+        """Saves success rates data to a CSV, Parquet or Feather file."""
+        self.save_frames([success_data], output_file)
+
+    def save_frames(self, frames, output_file, append=False):
+        """Writes the DataFrames one after the other into output_file, in the format of its extension.
+
+        frames may be a generator, so tables larger than memory can be written chunk by chunk.
+        """
+        if self.autosave is not None:
+            self.autosave.flush()  # A source written over must not be needed by a snapshot still queued
+        file_format = output_format(output_file)
+        if file_format == 'csv':
+            for index, frame in enumerate(frames):
+                write_csv(frame, output_file, self.decimal, append=append or index > 0)
+        elif append:
+            raise ValueError(f"Only CSV files can be appended to, not {file_format} files.")
+        else:
+            write_binary(frames, output_file, file_format)
 
     def clear_stock_data(self):
         """Clears the stock data."""
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class MappedTable:
+    """Table whose year columns live in a memory-mapped (rows x years) array on disk.
+
+    The remaining columns, such as the string Source column, are kept in memory as a
+    small DataFrame index. Rows are only paged in when they are read, so tables larger
+    than RAM can be loaded, projected and saved in row chunks.
+    """
+
+    def __init__(self, path, index, columns, column_order, dtype=np.float64, mode='r+'):
+        self.path = path
+        self.index = index
+        self.columns = list(columns)
+        self.column_order = list(column_order)
+        self.values = np.memmap(path, dtype=dtype, mode=mode, shape=(len(index), len(self.columns)))
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def shape(self):
+        return len(self.index), len(self.column_order)
+
+    @classmethod
+    def from_csv(cls, file_path, path, dtype=np.float64, chunk_size=100000, decimal='.'):
+        """Streams a semicolon CSV file into a new mapped table, filling NaNs with 0."""
+        index_chunks = []
+        columns = None
+        with open(path, 'wb') as data_file, \
+                pd.read_csv(file_path, sep=';', decimal=decimal, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                chunk = chunk.fillna(0)
+                if columns is None:
+                    column_order = list(chunk.columns)
+                    columns = [column for column in column_order if str(column).isdigit()]
+                index_chunks.append(chunk.drop(columns=columns))
+                data_file.write(chunk[columns].to_numpy(dtype=dtype).tobytes())
+            if data_file.tell() == 0:
+                data_file.write(b'\0')  # An empty file cannot be mapped
+        if columns is None:
+            header = pd.read_csv(file_path, sep=';', nrows=0)
+            column_order = list(header.columns)
+            columns = [column for column in column_order if str(column).isdigit()]
+            index_chunks.append(header.drop(columns=columns))
+        return cls(path, pd.concat(index_chunks, ignore_index=True), columns, column_order, dtype)
+
+    @classmethod
+    def create(cls, path, index, columns, column_order, dtype=np.float64):
+        """Creates a new mapped table of zeros with the given index and year columns."""
+        with open(path, 'wb') as data_file:
+            data_file.truncate(max(len(index) * len(columns) * np.dtype(dtype).itemsize, 1))
+        return cls(path, index, columns, column_order, dtype)
+
+    def column(self, name):
+        """Returns a view of one year column."""
+        return self.values[:, self.columns.index(name)]
+
+    def row_chunks(self, chunk_size):
+        """Yields (start, stop) bounds covering all rows in chunks of chunk_size."""
+        for start in range(0, len(self), chunk_size):
+            yield start, min(start + chunk_size, len(self))
+
+    def to_frame(self, start=0, stop=None):
+        """Materializes rows start:stop as a DataFrame in the original column order."""
+        frame = self.index.iloc[start:stop].copy()
+        values = self.values[start:stop]
+        for j, column in enumerate(self.columns):
+            frame[column] = values[:, j]
+        return frame[self.column_order]
+
+    def flush(self):
+        """Writes pending changes of the mapped array to disk."""
+        self.values.flush()
+
+    def close(self):
+        """Releases the mapping; the table must not be used afterwards."""
+        mapped = getattr(self.values, '_mmap', None)
+        self.values = None
+        if mapped is not None:
+            mapped.close()
+
+    def remove(self):
+        """Closes the table and deletes its backing file."""
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+CACHE_VERSION = 1
+
+
+class TableCache:
+    """Feather copy of a loaded CSV table, stored next to the CSV file.
+
+    The cache is keyed on the file path, size, modification time and content hash,
+    and on the decimal separator the file was parsed with. Size and mtime are checked
+    first; the content is only hashed when they disagree, so a touched but unchanged
+    file still loads from the cache.
+    """
+
+    def __init__(self, file_path, decimal='.'):
+        self.file_path = os.path.abspath(file_path)
+        self.decimal = decimal
+        self.data_path = self.file_path + '.cache.feather'
+        self.meta_path = self.file_path + '.cache.json'
+
+    def load(self):
+        """Returns the cached table, or None when there is no valid cache for the file."""
+        try:
+            with open(self.meta_path, encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            stat = os.stat(self.file_path)
+            if meta.get('version') != CACHE_VERSION or meta.get('path') != self.file_path or meta.get('size') != stat.st_size:
+                return None
+            if meta.get('decimal', '.') != self.decimal:
+                return None
+            if meta.get('mtime_ns') != stat.st_mtime_ns:
+                if meta.get('hash') != self.content_hash():
+                    return None
+                self._write_meta(meta['hash'], stat)
+            return pd.read_feather(self.data_path)
+        except (OSError, ValueError, ImportError):
+            return None
+
+    def store(self, data):
+        """Writes data as the cached table of the file; failures only mean there is no cache."""
+        temp_path = self.data_path + '.tmp'
+        try:
+            stat = os.stat(self.file_path)
+            content_hash = self.content_hash()
+            data.to_feather(temp_path)
+            os.replace(temp_path, self.data_path)
+            self._write_meta(content_hash, stat)
+        except Exception as e:
+            print(f"Could not cache {self.file_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def content_hash(self):
+        """Returns the BLAKE2 hash of the file content."""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(self.file_path, 'rb') as data_file:
+            for block in iter(lambda: data_file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _write_meta(self, content_hash, stat):
+        """Atomically writes the cache key of the current file."""
+        meta = {'version': CACHE_VERSION, 'path': self.file_path, 'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns, 'hash': content_hash, 'decimal': self.decimal}
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temp_path, self.meta_path)
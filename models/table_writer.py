@@ -0,0 +1,227 @@
+"""Writers of the tables as semicolon CSV, Parquet or Feather files.
+
+write_csv() writes the same bytes as DataFrame.to_csv(sep=';', index=False), several
+times faster: each column of a chunk of rows is formatted to text at once with numpy and
+pyarrow kernels and the rows are joined into one buffer written in a single call, instead
+of passing every cell through Python's csv module. Frames with columns it cannot format
+like pandas (dates, a lone column, ...) and a missing pyarrow fall back to to_csv.
+"""
+import csv
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from models.compact import DECIMALS, float_values
+
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+# Fields holding the separator, a quote or a character of the line end are quoted, like csv.QUOTE_MINIMAL does
+QUOTED = '[;"' + os.linesep + ']'
+MAX_DECIMALS = 6  # Floats with more decimals are formatted by numpy
+
+
+def output_format(file_path):
+    """Returns 'csv', 'parquet' or 'feather' after the extension of file_path, 'csv' for unknown ones."""
+    return FORMATS.get(os.path.splitext(file_path)[1].lower(), 'csv')
+
+
+def write_csv(data, file_path, decimal='.', append=False, chunk_size=100000):
+    """Writes data like data.to_csv(file_path, sep=';', decimal=decimal, index=False), appending without a header.
+
+    Compact tables are written with the values their float32 columns stand for, like a full load would be.
+    """
+    data = widened_frame(data)
+    if not can_format(data):
+        data.to_csv(file_path, sep=';', decimal=decimal, index=False, mode='a' if append else 'w', header=not append)
+        return
+    with open(file_path, 'ab' if append else 'wb') as output_file:
+        if not append:
+            output_file.write(format_header(data.columns).encode())
+        for start in range(0, len(data), chunk_size):
+            output_file.write(format_rows(data.iloc[start:start + chunk_size], decimal))
+
+
+def can_format(data):
+    """Tells whether format_rows() gives the text to_csv would write for every column of data."""
+    if data.shape[1] < 2:
+        return False  # csv quotes the empty field of a row with a single one
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return all(formattable(dtype) for dtype in data.dtypes)
+
+
+def formattable(dtype):
+    """Tells whether format_column() handles columns of the dtype."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories.dtype == object
+    return isinstance(dtype, np.dtype) and dtype.kind in 'iufbO'
+
+
+def format_header(columns):
+    """Returns the header line of the columns, as to_csv writes it."""
+    header = io.StringIO()
+    csv.writer(header, delimiter=';', lineterminator=os.linesep).writerow(columns)
+    return header.getvalue()
+
+
+def format_rows(data, decimal='.'):
+    """Returns the rows of data as the CSV bytes to_csv writes for them."""
+    import pyarrow.compute as pc
+
+    if not len(data):
+        return b''
+    columns = [format_column(data.iloc[:, j], decimal) for j in range(data.shape[1])]
+    rows = pc.binary_join_element_wise(pc.binary_join_element_wise(*columns, ';'), '', os.linesep)
+    offsets = np.frombuffer(rows.buffers()[1], dtype=np.int32)[rows.offset:rows.offset + len(rows) + 1]
+    return memoryview(rows.buffers()[2])[offsets[0]:offsets[-1]]
+
+
+def format_column(series, decimal='.'):
+    """Returns the values of series as the pyarrow strings to_csv writes for them; missing values are empty."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        categories = format_column(pd.Series(series.cat.categories, dtype=object), decimal)
+        return pc.take(categories, pa.array(codes, mask=codes < 0)).fill_null('')
+    values = series.to_numpy()
+    if values.dtype.kind in 'iu':
+        return integer_strings(values)
+    if values.dtype.kind == 'b':
+        return pa.array(np.where(values, 'True', 'False'))
+    if values.dtype.kind == 'f':
+        return format_floats(values, decimal)
+    # Objects are written as their str(), without the decimal separator applied to numbers
+    missing = pd.isna(values)
+    if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+        values = np.array([str(value) for value in values], dtype=object)
+    text = pa.array(values, type=pa.string(), mask=missing).fill_null('')
+    quoted = pc.match_substring_regex(text, QUOTED)
+    if pc.any(quoted).as_py():
+        text = pc.if_else(quoted, pc.binary_join_element_wise(
+            '"', pc.replace_substring(text, '"', '""'), '"', ''), text)
+    return text
+
+
+def format_floats(values, decimal='.'):
+    """Returns floats as numpy's shortest repr strings, like to_csv writes them; NaNs are empty."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    missing = np.isnan(values)
+    # Below 2 ** (mantissa bits + 1) every integer is exact, so an integral value's repr is its digits and '.0'
+    integral = ((np.abs(values) < 2.0 ** (np.finfo(values.dtype).nmant + 1)) & (values == np.trunc(values))
+                & ~((values == 0) & np.signbit(values)))
+    text = pc.binary_join_element_wise(integer_strings(np.where(integral, values, 0).astype(np.int64)),
+                                       decimal + '0', '')
+    other = ~integral & ~missing
+    if values.dtype == np.float64:
+        searched = other.copy()
+        for decimals in range(1, MAX_DECIMALS + 1):
+            if not searched.any():
+                break
+            found, digits, ambiguous = exact_decimals(values, searched, decimals)
+            if found.any():
+                text = pc.replace_with_mask(text, pa.array(found), decimal_strings(digits, decimals, decimal))
+            other &= ~found
+            searched &= ~found & ~ambiguous
+    if other.any():
+        rest = values[other].astype(str)
+        if decimal != '.':
+            rest = np.char.replace(rest, '.', decimal, count=1)
+        rest = pa.array(rest)
+        if isinstance(rest, pa.ChunkedArray):
+            rest = rest.combine_chunks()  # Long numpy string arrays convert in chunks
+        text = pc.replace_with_mask(text, pa.array(other), rest)
+    if missing.any():
+        text = pc.if_else(pa.array(missing), '', text)
+    return text
+
+
+def exact_decimals(values, candidates, decimals):
+    """Finds the candidate values whose shortest repr has the given number of decimals.
+
+    A value qualifies when exactly one number with that many decimals reads back as it.
+    Values searched with fewer decimals before have none, so that number is the shortest
+    repr. Returns the full-length mask of the found values, their digits scaled to integers,
+    and the mask of values with several such numbers, whose repr is left to numpy.
+    """
+    positions = np.flatnonzero(candidates)
+    subset = values[positions]
+    scale = 10.0 ** decimals
+    scaled = subset * scale
+    # Positional notation, and scaled digits exact enough that the number is the floor or ceiling of scaled
+    searchable = (np.abs(subset) >= 1e-4) & (np.abs(scaled) < 2.0 ** 50)
+    low = np.floor(scaled)
+    low_exact = low / scale == subset
+    high_exact = (low + 1) / scale == subset
+    unique = searchable & (low_exact != high_exact)
+    found = np.zeros(len(values), dtype=bool)
+    found[positions[unique]] = True
+    ambiguous = np.zeros(len(values), dtype=bool)
+    ambiguous[positions[~searchable | (low_exact & high_exact)]] = True
+    return found, np.where(low_exact, low, low + 1)[unique].astype(np.int64), ambiguous
+
+
+def decimal_strings(digits, decimals, decimal='.'):
+    """Returns digits / 10 ** decimals as pyarrow strings with exactly that many decimals."""
+    import pyarrow.compute as pc
+
+    magnitude = np.abs(digits)
+    text = pc.binary_join_element_wise(
+        integer_strings(magnitude // 10 ** decimals),
+        pc.utf8_lpad(integer_strings(magnitude % 10 ** decimals), width=decimals, padding='0'), decimal)
+    negative = digits < 0
+    if negative.any():
+        text = pc.if_else(negative, pc.binary_join_element_wise('-', text, ''), text)
+    return text
+
+
+def integer_strings(values):
+    """Returns integers as pyarrow strings."""
+    import pyarrow as pa
+
+    return pa.array(values).cast(pa.string())
+
+
+def write_binary(frames, file_path, file_format):
+    """Writes the DataFrames one after the other into one Parquet or Feather (Arrow IPC) file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = schema = None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(widened_frame(frame), schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = (pq.ParquetWriter(file_path, schema) if file_format == 'parquet'
+                          else pa.ipc.new_file(file_path, schema))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def widened_frame(data):
+    """Returns data with the columns of a compact table widened back to the types and values of a full load.
+
+    float32 columns would otherwise be written as the shortest float32 repr, like 1234567.2
+    for a stored 1234567.25, instead of the value they restore to.
+    """
+    if DECIMALS not in data.attrs:
+        return data
+    widened = data.copy(deep=False)  # Widened columns are replaced, never written in place
+    for j, column in enumerate(data.columns):
+        series = data.iloc[:, j]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            widened.isetitem(j, series.astype(object))
+        elif series.dtype == np.float32:
+            widened.isetitem(j, float_values(data, [column])[:, 0])
+        elif series.dtype == np.int32:
+            widened.isetitem(j, series.astype(np.int64))
+    return widened
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from controllers.alignment import RowAlignment
+from controllers.stock_manager import StockManager
+from tests.test_stock_manager import END_YEAR, START_YEAR, load, make_tables
+
+
+def keyed(keys, **columns):
+    return pd.DataFrame(dict({'Source': keys}, **columns))
+
+
+def test_shuffled_rate_tables_project_like_aligned_ones():
+    stock, failure, success = make_tables(80)
+    expected = StockManager(load(stock, failure, success)).update_stock(START_YEAR, END_YEAR)
+    failure = failure.sample(frac=1, random_state=1).reset_index(drop=True)
+    success = success.sample(frac=1, random_state=2).reset_index(drop=True)
+    manager = StockManager(load(stock, failure, success), key='Source')
+    pd.testing.assert_frame_equal(manager.update_stock(START_YEAR, END_YEAR), expected)
+    assert manager.alignment.complete
+
+
+def test_repeated_keys_pair_in_order():
+    alignment = RowAlignment.by_key(keyed(['A', 'B', 'A']), keyed(['A', 'A', 'B']), keyed(['B', 'A', 'A']))
+    np.testing.assert_array_equal(alignment.stock_rows, [0, 1, 2])
+    np.testing.assert_array_equal(alignment.failure_rows, [0, 2, 1])
+    np.testing.assert_array_equal(alignment.success_rows, [1, 0, 2])
+    assert alignment.complete
+
+
+def test_missing_keys_are_never_paired():
+    # Loaded tables have their empty cells filled with 0
+    stock = keyed(['A', 0, 'B'], **{'2023': [10.0, 10.0, 10.0], '2024': [0.0, 0.0, 0.0]})
+    failure = keyed([0, 'A', 'B'], **{'2024': [50.0, 0.0, 0.0]})
+    success = keyed(['', 'A', 'B'], **{'2024': [0.0, 0.0, 0.0]})
+    alignment = RowAlignment.by_key(stock, failure, success)
+    np.testing.assert_array_equal(alignment.stock_rows, [0, 2])
+    np.testing.assert_array_equal(alignment.unmatched_stock, [1])
+    np.testing.assert_array_equal(alignment.unmatched_failure, [0])
+    np.testing.assert_array_equal(alignment.unmatched_success, [0])
+    assert not alignment.complete
+
+    result = StockManager(load(stock, failure, success), key='Source').update_stock(2024, 2024)
+    assert result['2024'].tolist() == [10, 0, 10]  # The keyless stock row is not projected with the 50% rate
+    assert alignment.describe(stock, failure, success) == (
+        "1 stock rows without failure or success rates: (no key)\n"
+        "1 failure rows without a match in the other tables: (no key)\n"
+        "1 success rows without a match in the other tables: (no key)")
+
+
+def test_describe_lists_unmatched_rows():
+    alignment = RowAlignment.by_key(keyed(['A', 'B', 'C']), keyed(['A', 'C']), keyed(['A', 'B', 'C', 'D']))
+    assert alignment.describe(keyed(['A', 'B', 'C']), keyed(['A', 'C']), keyed(['A', 'B', 'C', 'D'])) == (
+        "1 stock rows without failure or success rates: B\n"
+        "2 success rows without a match in the other tables: B, D")
+    positional = RowAlignment.by_position(3, 2, 3)
+    assert positional.describe(keyed(['A', 'B', 'C']), keyed(['A', 'B']), keyed(['A', 'B', 'C'])) == (
+        "1 stock rows without failure or success rates: 3\n"
+        "1 success rows without a match in the other tables: 3")
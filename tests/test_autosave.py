@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+
+from models.autosave import Autosave, journal_path, previous_sessions, recover
+from models.database import Database
+
+
+def loaded_database(tmp_path, compact_every=10000):
+    """Returns a Database autosaving to tmp_path/'session' with a small stock table loaded."""
+    source = tmp_path / 'stock.csv'
+    source.write_text('Source;2023;2024\nPart 1;10;1.5\nPart 2;20;2.5\nPart 3;30;3.5\n')
+    database = Database(use_cache=False, autosave=Autosave(str(tmp_path / 'session'), compact_every))
+    database.load_stock_data(str(source))
+    return database
+
+
+def edit(database):
+    database.set_cell('stock', 0, 1, 11.0)
+    database.set_cell('stock', 1, 0, 'Renamed')
+    database.append_row('stock', ['Part 4', 40, 4.5])
+    database.add_column('stock', '2025', 0.5)
+    database.set_cell('stock', 3, 3, 7.25)
+
+
+def test_recover_rebuilds_edited_tables(tmp_path):
+    database = loaded_database(tmp_path)
+    edit(database)
+    database.autosave.flush()
+    tables = recover(str(tmp_path / 'session'), database.read_table)
+    pd.testing.assert_frame_equal(tables['stock'][0], database.stock_data, check_dtype=False)
+    assert tables['stock'][1] == str(tmp_path / 'stock.csv')
+    database.autosave.close()
+
+
+def test_loading_writes_no_copy_of_the_table(tmp_path):
+    database = loaded_database(tmp_path)
+    database.autosave.flush()
+    assert os.path.getsize(tmp_path / 'session' / 'stock.snapshot') < 1000
+    pd.testing.assert_frame_equal(recover(str(tmp_path / 'session'), database.read_table)['stock'][0],
+                                  database.stock_data)
+    database.autosave.close()
+
+
+def test_edits_survive_saving_over_the_source(tmp_path):
+    database = loaded_database(tmp_path)
+    edit(database)  # Saved right away, while the full snapshot may still be queued
+    database.save_stock_data(database.stock_data.iloc[:1], str(tmp_path / 'stock.csv'))
+    database.set_cell('stock', 2, 1, 33.0)
+    database.autosave.flush()
+    tables = recover(str(tmp_path / 'session'), database.read_table)
+    pd.testing.assert_frame_equal(tables['stock'][0], database.stock_data, check_dtype=False)
+    database.autosave.close()
+
+
+def test_compaction_and_a_truncated_journal_line(tmp_path):
+    database = loaded_database(tmp_path, compact_every=3)
+    edit(database)
+    database.set_cell('stock', 2, 2, 9.5)
+    database.autosave.flush()
+    with open(journal_path(str(tmp_path / 'session'), 'stock'), 'a', encoding='utf-8') as journal:
+        journal.write('{"row": 0, "col')  # A write cut short by a crash
+    tables = recover(str(tmp_path / 'session'), database.read_table)
+    pd.testing.assert_frame_equal(tables['stock'][0], database.stock_data, check_dtype=False)
+    database.autosave.close()
+
+
+def test_restore_autosave_takes_over_a_previous_session(tmp_path):
+    previous = loaded_database(tmp_path)
+    edit(previous)
+    previous.autosave.close()
+    os.rename(tmp_path / 'session', tmp_path / '999999999')
+    assert previous_sessions(str(tmp_path)) == [str(tmp_path / '999999999')]
+
+    database = Database(use_cache=False, autosave=Autosave(str(tmp_path / str(os.getpid()))))
+    assert database.restore_autosave(str(tmp_path / '999999999')) == {'stock': str(tmp_path / 'stock.csv')}
+    pd.testing.assert_frame_equal(database.stock_data, previous.stock_data, check_dtype=False)
+    assert not os.path.exists(tmp_path / '999999999')
+    assert previous_sessions(str(tmp_path)) == []
+    database.autosave.discard()
+    database.autosave.close()
+    assert not os.path.exists(tmp_path / str(os.getpid()))
@@ -0,0 +1,92 @@
+import numpy as np
+
+from models.change_log import ChangeLog
+from models.database import Database
+
+
+def loaded_database(tmp_path):
+    source = tmp_path / 'stock.csv'
+    source.write_text('Source;2023;2024\nPart 1;10;1.5\nPart 2;20;2.5\n')
+    database = Database(use_cache=False)
+    database.load_stock_data(str(source))
+    return database, str(source)
+
+
+def test_undo_and_redo_walk_the_changes():
+    changes = ChangeLog()
+    changes.record('stock', 0, 1, 10, 11)
+    changes.record('stock', 1, 1, 20, 21)
+    assert changes.undo() == ('stock', 1, 1, 20, 21)
+    assert changes.undo() == ('stock', 0, 1, 10, 11)
+    assert changes.undo() is None and not changes.can_undo
+    assert changes.redo() == ('stock', 0, 1, 10, 11)
+    assert changes.can_redo
+
+
+def test_a_new_edit_drops_the_undone_changes():
+    changes = ChangeLog()
+    changes.record('stock', 0, 1, 10, 11)
+    changes.record('stock', 1, 1, 20, 21)
+    changes.undo()
+    changes.record('stock', 0, 2, 1.5, 3.5)
+    assert not changes.can_redo and changes.redo() is None
+    assert changes.changes == [('stock', 0, 1, 10, 11), ('stock', 0, 2, 1.5, 3.5)]
+
+
+def test_forget_drops_the_changes_of_one_table():
+    changes = ChangeLog()
+    changes.record('stock', 0, 1, 10, 11)
+    changes.record('failure', 0, 1, 5, 6)
+    changes.record('stock', 1, 1, 20, 21)
+    changes.undo()
+    changes.forget('stock')
+    assert changes.changes == [('failure', 0, 1, 5, 6)]
+    assert changes.position == 1 and not changes.can_redo
+
+
+def test_diff_collapses_repeated_edits():
+    changes = ChangeLog()
+    changes.record('stock', 0, 1, 10, 11)
+    changes.record('stock', 0, 1, 11, 12)
+    changes.record('stock', 1, 1, 20, 21)
+    changes.record('stock', 1, 1, 21, 20)  # Back to the loaded value
+    changes.record('stock', 0, 2, np.nan, 1.0)
+    changes.record('stock', 0, 2, 1.0, np.nan)
+    changes.record('failure', 0, 1, 5, 6)
+    assert changes.diff('stock') == {(0, 1): (10, 12)}
+    for _ in range(4):
+        changes.undo()
+    assert changes.diff('stock') == {(0, 1): (10, 12), (1, 1): (20, 21)}
+
+
+def test_database_undo_and_redo_restore_cells(tmp_path):
+    database, _ = loaded_database(tmp_path)
+    database.set_cell('stock', 0, 1, 11)
+    database.set_cell('stock', 0, 1, 12)
+    database.set_cell('stock', 1, 2, 2.5)  # Unchanged, nothing to undo
+    assert database.undo() == ('stock', 0, 1)
+    assert database.stock_data.iat[0, 1] == 11
+    assert database.undo() == ('stock', 0, 1)
+    assert database.stock_data.iat[0, 1] == 10
+    assert database.undo() is None
+    assert database.redo() == ('stock', 0, 1)
+    assert database.stock_data.iat[0, 1] == 11
+    assert database.dirty_rows[0] == float('-inf')
+
+
+def test_changed_cells_lists_loaded_and_current_values(tmp_path):
+    database, _ = loaded_database(tmp_path)
+    database.set_cell('stock', 1, 2, 4.5)
+    database.set_cell('stock', 1, 2, 5.5)
+    database.set_cell('stock', 0, 0, 'Renamed')
+    changed = database.changed_cells('stock')
+    assert changed.to_dict('list') == {'Row': [0, 1], 'Column': ['Source', '2024'],
+                                       'Loaded': ['Part 1', 2.5], 'Current': ['Renamed', 5.5]}
+
+
+def test_reloading_a_table_forgets_its_changes(tmp_path):
+    database, source = loaded_database(tmp_path)
+    database.set_cell('stock', 0, 1, 11)
+    database.load_stock_data(source)
+    assert database.undo() is None
+    assert database.changed_cells('stock').empty
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from controllers.stock_manager import StockManager
+from models.database import Database
+from models.table_writer import widened_frame
+from tests.test_stock_manager import END_YEAR, START_YEAR, make_tables, write_tables
+
+
+def load_files(paths, **options):
+    database = Database(use_cache=False, **options)
+    database.load_stock_data(paths[0])
+    database.load_failure_rates(paths[1])
+    database.load_success_rates(paths[2])
+    return database
+
+
+@pytest.fixture
+def table_files(tmp_path):
+    stock, failure, success = make_tables(200)
+    stock.loc[0, '2023'] = 1234567.25  # Exact in float32, whose shortest repr is 1234567.2
+    stock.loc[1, '2024'] = 0.1
+    return write_tables(tmp_path, (stock, failure, success))
+
+
+def test_compact_tables_save_like_full_ones(tmp_path, table_files):
+    full, compact = load_files(table_files), load_files(table_files, compact=True)
+    assert (compact.stock_data.dtypes == 'float32').any()
+    for name, database in (('full', full), ('compact', compact)):
+        database.save_stock_data(database.stock_data, str(tmp_path / f'{name}.csv'))
+        database.save_failure_data(database.failure_data, str(tmp_path / f'{name}_failure.csv'))
+    assert (tmp_path / 'compact.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
+    assert (tmp_path / 'compact_failure.csv').read_bytes() == (tmp_path / 'full_failure.csv').read_bytes()
+    assert compact.stock_data['2023'].dtype == 'float32'  # Saving does not widen the loaded table
+
+
+@pytest.mark.parametrize('mode', ['stepwise', 'cumulative'])
+def test_compact_tables_project_like_full_ones(tmp_path, table_files, mode):
+    full, compact = load_files(table_files), load_files(table_files, compact=True)
+    expected = StockManager(full).update_stock(START_YEAR, END_YEAR, mode)
+    result = StockManager(compact).update_stock(START_YEAR, END_YEAR, mode)
+    pd.testing.assert_frame_equal(widened_frame(result), expected, check_dtype=False, check_exact=True)
+    compact.save_stock_data(result, str(tmp_path / 'compact.csv'))
+    full.save_stock_data(expected, str(tmp_path / 'full.csv'))
+    assert (tmp_path / 'compact.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
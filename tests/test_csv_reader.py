@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from models.csv_reader import read_csv
+
+pytest.importorskip('pyarrow')
+
+FILES = {
+    'numbers': 'Source;2023;2024;2025\nPart 1;10;1.5;\nPart 2;20;2.25;3\n',
+    'text': 'Source;Note;Flag;Empty\nPart 1;None;True;\nPart 2;NA;false;\nPart 3;"a;b";TRUE;\n',
+    'missing flags': 'Source;Flag\nPart 1;True\nPart 2;\n',
+    'dates': 'Source;Date;Time\nPart 1;2024-01-31;12:30:00\nPart 2;2024-02-29;08:00:00\n',
+    'duplicates': 'Source;2024;2024\nPart 1;1;2\n',
+    'header only': 'Source;2023;2024\n',
+    'missing fields': 'Source;2023;2024\nPart 1;1\nPart 2;2;3\n',
+}
+
+
+@pytest.mark.parametrize('name', FILES)
+@pytest.mark.filterwarnings('error::FutureWarning')  # None where pandas has NaN only warns
+def test_pyarrow_engine_reads_like_pandas(tmp_path, name):
+    path = tmp_path / 'table.csv'
+    path.write_text(FILES[name])
+    pd.testing.assert_frame_equal(read_csv(str(path), 'pyarrow'), read_csv(str(path), 'pandas'))
+
+
+def test_decimal_comma(tmp_path):
+    path = tmp_path / 'table.csv'
+    path.write_text('Source;2023;2024\nPart 1;1,5;2\nPart 2;3;4,25\n')
+    expected = pd.DataFrame({'Source': ['Part 1', 'Part 2'], '2023': [1.5, 3.0], '2024': [2.0, 4.25]})
+    for engine in ('pandas', 'pyarrow'):
+        pd.testing.assert_frame_equal(read_csv(str(path), engine, decimal=','), expected)
+
+
+def test_unknown_engine(tmp_path):
+    with pytest.raises(ValueError):
+        read_csv(str(tmp_path / 'table.csv'), 'polars')
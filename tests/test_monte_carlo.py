@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers.monte_carlo import PART_BLOCK, RateDistribution
+from controllers.stock_manager import StockManager
+from tests.test_stock_manager import END_YEAR, START_YEAR, load, make_tables
+
+
+@pytest.mark.parametrize('kind', RateDistribution.KINDS)
+def test_zero_spread_matches_update_stock(kind):
+    stock, failure, success = make_tables(300)
+    manager = StockManager(load(stock, failure, success))
+    expected = manager.update_stock(START_YEAR, END_YEAR)
+    result = manager.monte_carlo(START_YEAR, END_YEAR, samples=5, failure_distribution=RateDistribution(kind, 0),
+                                 success_distribution=RateDistribution(kind, 0), seed=1)
+    for percentile in result.percentiles:
+        pd.testing.assert_frame_equal(result.frame(percentile), expected)
+
+
+def test_seed_gives_the_same_bands_whatever_the_chunk_size():
+    stock, failure, success = make_tables(3 * PART_BLOCK + 10)
+    manager = StockManager(load(stock, failure, success))
+    bands = [manager.monte_carlo(START_YEAR, END_YEAR, samples=50, seed=7, max_bytes=max_bytes).bands
+             for max_bytes in (1, 50 * 64 * PART_BLOCK * 2, 256 * 1024 ** 2)]
+    for other in bands[1:]:
+        np.testing.assert_array_equal(other, bands[0])
+    assert not np.array_equal(manager.monte_carlo(START_YEAR, END_YEAR, samples=50, seed=8).bands, bands[0])
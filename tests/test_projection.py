@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers.projection import CumulativeProjection, project
+from controllers.stock_manager import StockManager
+from tests.test_stock_manager import END_YEAR, START_YEAR, load, make_tables
+
+
+def random_arrays(rows, years, seed=0):
+    random = np.random.default_rng(seed)
+    base = random.uniform(0, 1000, rows)
+    additions = random.uniform(0, 100, (rows, years))
+    failure = random.uniform(0, 50, (rows, years))
+    success = random.uniform(0, 100, (rows, years))
+    failure[random.random((rows, years)) < 0.05] = 0
+    return base, additions, failure, success
+
+
+def long_horizon_tables(rows, last_year=2100):
+    """Returns tables from 2024 to last_year whose first rows lose their stock every year."""
+    years = [str(year) for year in range(START_YEAR, last_year + 1)]
+    base, additions, failure, success = random_arrays(rows, len(years))
+    failure[:3], success[:3] = 100, 0.001  # Growth factor 1e-5, whose product underflows after 65 years
+    failure[3, 40], success[3, 40] = 100, 0  # A zero factor
+    names = {'Source': [f'Part {i}' for i in range(rows)]}
+    stock = pd.DataFrame(dict(names, **{'2023': np.round(base)}, **dict(zip(years, np.round(additions.T)))))
+    return stock, pd.DataFrame(dict(names, **dict(zip(years, failure.T)))), \
+        pd.DataFrame(dict(names, **dict(zip(years, success.T))))
+
+
+@pytest.mark.parametrize('years', [7, 77])
+def test_cumulative_projection_matches_project(years):
+    base, additions, failure, success = random_arrays(100, years)
+    failure[:3], success[:3] = 100, 0.001
+    projection = CumulativeProjection(base, additions, failure, success, range(START_YEAR, START_YEAR + years))
+    expected = project(base, additions, failure, success)
+    np.testing.assert_allclose(projection.to_array(), expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(projection.stock_in_year(START_YEAR + years - 1), np.trunc(expected[:, -1]) + 0)
+
+
+def test_cumulative_projection_with_scenario_axis():
+    base, additions, failure, success = random_arrays(30, 77)
+    failure[:3], success[:3] = 100, 0.001
+    failure = failure * np.array([1.0, 0.5])[:, None, None]
+    projection = CumulativeProjection(base, additions, failure, success, range(START_YEAR, START_YEAR + 77))
+    np.testing.assert_allclose(projection.to_array(), project(base, additions, failure, success),
+                               rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('last_year', [END_YEAR, 2100])
+def test_cumulative_update_matches_stepwise(last_year):
+    if last_year == END_YEAR:
+        stock, failure, success = make_tables(200)
+    else:
+        stock, failure, success = long_horizon_tables(200, last_year)
+    expected = StockManager(load(stock, failure, success)).update_stock(START_YEAR, last_year)
+    result = StockManager(load(stock, failure, success)).update_stock(START_YEAR, last_year, 'cumulative')
+    years = [str(year) for year in range(START_YEAR, last_year + 1)]
+    difference = np.abs(result[years].to_numpy(dtype=float) - expected[years].to_numpy(dtype=float))
+    assert difference.max() <= 1  # Truncation of values on an integer boundary
+    assert (difference > 0).mean() < 0.01
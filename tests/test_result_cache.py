@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+from controllers.result_cache import ResultCache
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    cache = ResultCache(max_bytes=3 * 8000)
+    for key in 'abc':
+        cache.put(key, np.zeros(1000))
+    assert cache.get('a') is not None  # a is now used more recently than b
+    cache.put('d', np.zeros(1000))
+    assert cache.get('b') is None
+    assert [cache.get(key) is not None for key in 'acd'] == [True, True, True]
+    assert cache.size == 3 * 8000
+
+
+def test_keeps_no_value_larger_than_max_bytes():
+    cache = ResultCache(max_bytes=1000)
+    cache.put('small', np.zeros(10))
+    cache.put('large', np.zeros(1000))
+    assert cache.get('large') is None
+    assert cache.get('small') is not None
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    ResultCache(directory=str(tmp_path)).put('key', np.arange(5))
+    cache = ResultCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(cache.get('key'), np.arange(5))
+    assert 'key' in cache.entries  # Promoted to memory
+    assert cache.get('missing') is None
+
+
+@pytest.mark.parametrize('content', [b'\x80\x05\x95', b'cno_such_module_here\nThing\n.', b'cos\nno_such_function\n.'],
+                         ids=['truncated', 'missing module', 'missing attribute'])
+def test_unreadable_disk_entries_are_deleted_misses(tmp_path, content):
+    (tmp_path / 'key.pkl').write_bytes(content)
+    assert ResultCache(directory=str(tmp_path)).get('key') is None
+    assert not os.path.exists(tmp_path / 'key.pkl')
+
+
+def test_disk_tier_is_trimmed_oldest_used_first(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), max_disk_bytes=2 * 8300)
+    for number, key in enumerate('abc'):
+        cache.put(key, np.zeros(1000))
+        os.utime(tmp_path / f'{key}.pkl', (number, number))
+        if key == 'b':
+            cache.clear()
+            cache.get('a')  # Read back from disk, which marks it as recently used
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'c.pkl']
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from controllers.scenarios import Scenario
+from controllers.stock_manager import StockManager
+from tests.test_stock_manager import END_YEAR, START_YEAR, load, make_tables
+
+
+def scaled(table, scale):
+    table = table.copy()
+    years = [column for column in table.columns if column.isdigit()]
+    table[years] = table[years] * scale
+    return table
+
+
+def test_base_scenario_matches_update_stock():
+    stock, failure, success = make_tables(50, failure_rows=40, success_rows=45)
+    manager = StockManager(load(stock, failure, success))
+    result = manager.run_scenarios([Scenario('Base')], START_YEAR, END_YEAR, workers=1)
+    pd.testing.assert_frame_equal(result.frame('Base'), manager.update_stock(START_YEAR, END_YEAR))
+
+
+def test_scaled_and_own_table_scenarios_match_update_stock():
+    stock, failure, success = make_tables(200)
+    other_failure = make_tables(200, seed=1)[1]
+    scenarios = [Scenario('Base'), Scenario('Worse', failure_scale=1.2, success_scale=0.5),
+                 Scenario('Other', failure_rates=other_failure)]
+    result = StockManager(load(stock, failure, success)).run_scenarios(scenarios, START_YEAR, END_YEAR, workers=1)
+    for name, tables in (('Worse', (scaled(failure, 1.2), scaled(success, 0.5))), ('Other', (other_failure, success))):
+        expected = StockManager(load(stock, *tables)).update_stock(START_YEAR, END_YEAR)
+        pd.testing.assert_frame_equal(result.frame(name), expected)
+    totals = result.totals()
+    assert list(totals.index) == ['Base', 'Worse', 'Other']
+    assert totals.loc['Base', str(END_YEAR)] == result.values[0, :, -1].sum()
+
+
+def test_pooled_scenarios_match_in_process_ones():
+    stock, failure, success = make_tables(300)
+    scenarios = [Scenario(f'x{scale}', failure_scale=scale) for scale in (0.5, 0.8, 1.0, 1.2, 1.5)]
+    manager = StockManager(load(stock, failure, success))
+    in_process = manager.run_scenarios(scenarios, START_YEAR, END_YEAR, workers=1)
+    pooled = manager.run_scenarios(scenarios, START_YEAR, END_YEAR, workers=2)
+    np.testing.assert_array_equal(pooled.values, in_process.values)
+    pd.testing.assert_frame_equal(pooled.frame('x1.2'), in_process.frame('x1.2'))
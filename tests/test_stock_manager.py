@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers.stock_manager import StockManager
+from models.database import Database
+
+START_YEAR, END_YEAR = 2024, 2030
+
+
+def make_tables(rows, seed=0, failure_rows=None, success_rows=None):
+    """Returns random stock, failure and success tables shaped like the app's CSV files."""
+    random = np.random.default_rng(seed)
+    years = [str(year) for year in range(START_YEAR, END_YEAR + 1)]
+    stock = pd.DataFrame({'Source': [f'Part {i}' for i in range(rows)],
+                          '2023': random.integers(0, 500, rows).astype(float)})
+    for year in years[::2]:
+        additions = random.integers(0, 50, rows).astype(float)
+        additions[random.random(rows) < 0.3] = np.nan
+        stock[year] = additions
+
+    def rates(length, high):
+        table = pd.DataFrame({'Source': [f'Part {i}' for i in range(length)]})
+        for year in years:
+            values = np.round(random.uniform(0, high, length), 2)
+            values[random.random(length) < 0.2] = 0
+            table[year] = values
+        return table
+
+    return stock, rates(failure_rows or rows, 30), rates(success_rows or rows, 100)
+
+
+def scalar_update(stock_data, failure_data, success_data, start_year, end_year):
+    """The original row-by-row projection loop the vectorized engines must reproduce."""
+    calculate = StockManager(None)._calculate_end_of_year_stock
+    stock_data = stock_data.copy().fillna(0)
+    failure_rates = failure_data.fillna(0)
+    success_rates = success_data.fillna(0)
+    for year in range(start_year, end_year + 1):
+        if str(year) not in stock_data.columns:
+            stock_data[str(year)] = np.nan
+    for index in stock_data.index:
+        if index < len(failure_rates) and index < len(success_rates):
+            current_stock = float(stock_data.at[index, '2023'])
+            for year in range(start_year, end_year + 1):
+                year_column = str(year)
+                if year_column in failure_rates.columns and year_column in success_rates.columns:
+                    if not np.isnan(stock_data.at[index, year_column]):
+                        current_stock += float(stock_data.at[index, year_column])
+                    current_stock = calculate(current_stock, float(failure_rates.at[index, year_column]),
+                                              float(success_rates.at[index, year_column]))
+                    stock_data.at[index, year_column] = int(current_stock)
+    return stock_data
+
+
+def load(stock, failure, success, **options):
+    database = Database(use_cache=False, **options)
+    database.stock_data, database.failure_data, database.success_data = stock, failure, success
+    return database
+
+
+@pytest.mark.parametrize('mode', StockManager.MODES)
+@pytest.mark.parametrize('rows, failure_rows, success_rows', [(200, None, None), (50, 40, 45), (30, 60, 60)])
+def test_update_matches_scalar_loop(rows, failure_rows, success_rows, mode):
+    stock, failure, success = make_tables(rows, failure_rows=failure_rows, success_rows=success_rows)
+    expected = scalar_update(stock, failure, success, START_YEAR, END_YEAR)
+    result = StockManager(load(stock, failure, success)).update_stock(START_YEAR, END_YEAR, mode)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_update_leaves_loaded_tables_unchanged():
+    stock, failure, success = make_tables(20)
+    originals = [table.copy() for table in (stock, failure, success)]
+    StockManager(load(stock, failure, success)).update_stock(START_YEAR, END_YEAR)
+    for table, original in zip((stock, failure, success), originals):
+        pd.testing.assert_frame_equal(table, original)
+
+
+def test_incremental_update_matches_full_update():
+    stock, failure, success = make_tables(100)
+    database = load(stock, failure, success)
+    manager = StockManager(database)
+    manager.update_stock(START_YEAR, END_YEAR)
+    database.set_cell('stock', 3, 1, 999.0)  # The base stock
+    database.set_cell('stock', 7, stock.columns.get_loc('2028'), 12.0)
+    database.set_cell('failure', 50, failure.columns.get_loc('2026'), 25.0)
+    database.set_cell('success', 99, success.columns.get_loc('2030'), 0.0)
+    result = manager.update_stock_incremental(START_YEAR, END_YEAR)
+    assert not database.dirty_rows
+    pd.testing.assert_frame_equal(result, StockManager(database).update_stock(START_YEAR, END_YEAR))
+
+
+def test_incremental_update_ignores_rate_rows_without_stock():
+    stock, failure, success = make_tables(20)
+    database = load(stock, failure, success)
+    manager = StockManager(database)
+    manager.update_stock(START_YEAR, END_YEAR)
+    database.append_row('failure', ['Part 20'] + [10.0] * (failure.shape[1] - 1))
+    database.set_cell('failure', 20, 1, 5.0)
+    result = manager.update_stock_incremental(START_YEAR, END_YEAR)
+    assert not database.dirty_rows
+    pd.testing.assert_frame_equal(result, StockManager(database).update_stock(START_YEAR, END_YEAR))
+
+
+def test_incremental_update_reruns_after_rate_rows_are_appended():
+    stock, failure, success = make_tables(20, failure_rows=19, success_rows=19)
+    database = load(stock, failure, success)
+    manager = StockManager(database)
+    manager.update_stock(START_YEAR, END_YEAR)
+    database.append_row('failure', ['Part 19'] + [10.0] * (failure.shape[1] - 1))
+    database.append_row('success', ['Part 19'] + [50.0] * (success.shape[1] - 1))
+    result = manager.update_stock_incremental(START_YEAR, END_YEAR)
+    pd.testing.assert_frame_equal(result, StockManager(database).update_stock(START_YEAR, END_YEAR))
+
+
+def write_tables(directory, tables):
+    """Writes the tables as the app's semicolon CSV files and returns their paths."""
+    paths = []
+    for name, table in zip(('stock', 'failure', 'success'), tables):
+        paths.append(str(directory / f'{name}.csv'))
+        table.to_csv(paths[-1], sep=';', index=False)
+    return paths
+
+
+@pytest.mark.parametrize('rows, failure_rows', [(60, None), (60, 45)])
+def test_stream_stock_writes_the_saved_update(tmp_path, rows, failure_rows):
+    stock_file, failure_file, success_file = write_tables(tmp_path, make_tables(rows, failure_rows=failure_rows))
+    database = Database(use_cache=False)
+    database.load_stock_data(stock_file)
+    database.load_failure_rates(failure_file)
+    database.load_success_rates(success_file)
+    database.save_stock_data(StockManager(database).update_stock(START_YEAR, END_YEAR), str(tmp_path / 'full.csv'))
+
+    StockManager(Database(use_cache=False)).stream_stock(stock_file, failure_file, success_file,
+                                                         str(tmp_path / 'streamed.csv'), START_YEAR, END_YEAR,
+                                                         chunk_size=7)
+    assert (tmp_path / 'streamed.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
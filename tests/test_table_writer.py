@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.compact import compact_table
+from models.table_writer import output_format, write_binary, write_csv
+
+pytest.importorskip('pyarrow')
+
+
+def sample_frame(rows=500, seed=0):
+    """Returns a table with every column kind write_csv formats itself, with awkward values."""
+    random = np.random.default_rng(seed)
+    floats = np.array([round(value, digits) for value, digits in zip(random.uniform(-1000, 1000, rows),
+                                                                      random.integers(0, 8, rows))])
+    floats[::17] = np.nan
+    floats[1:4] = [-0.0, 1e-5, 2.0 ** 60]
+    text = np.array([f'Part {i}' for i in range(rows)], dtype=object)
+    text[1:5] = ['a;b', 'say "hi"', 'two\nlines', None]
+    return pd.DataFrame({
+        'Source': text,
+        '2023': random.integers(-500, 500, rows),
+        '2024': floats,
+        '2025': random.uniform(0, 1, rows),
+        '2026': random.uniform(0, 1, rows).astype(np.float32),
+        'Flag': random.random(rows) < 0.5,
+        'Kind': pd.Categorical(random.choice(['x', 'y;z'], rows)),
+    })
+
+
+@pytest.mark.parametrize('decimal', ['.', ','])
+def test_write_csv_matches_to_csv(tmp_path, decimal):
+    data = sample_frame()
+    data.to_csv(tmp_path / 'expected.csv', sep=';', decimal=decimal, index=False)
+    write_csv(data, str(tmp_path / 'written.csv'), decimal, chunk_size=64)
+    assert (tmp_path / 'written.csv').read_bytes() == (tmp_path / 'expected.csv').read_bytes()
+
+
+def test_write_csv_appends_without_header(tmp_path):
+    first, second = sample_frame(seed=1), sample_frame(seed=2)
+    first.to_csv(tmp_path / 'expected.csv', sep=';', index=False)
+    second.to_csv(tmp_path / 'expected.csv', sep=';', index=False, mode='a', header=False)
+    write_csv(first, str(tmp_path / 'written.csv'))
+    write_csv(second, str(tmp_path / 'written.csv'), append=True)
+    assert (tmp_path / 'written.csv').read_bytes() == (tmp_path / 'expected.csv').read_bytes()
+
+
+@pytest.mark.parametrize('data', [pd.DataFrame({'Source': ['a', None]}), pd.DataFrame({'Source': [], '2023': []}),
+                                  pd.DataFrame({'Date': pd.to_datetime(['2024-01-01']), '2023': [1.5]})])
+def test_write_csv_falls_back_to_to_csv(tmp_path, data):
+    data.to_csv(tmp_path / 'expected.csv', sep=';', index=False)
+    write_csv(data, str(tmp_path / 'written.csv'))
+    assert (tmp_path / 'written.csv').read_bytes() == (tmp_path / 'expected.csv').read_bytes()
+
+
+@pytest.mark.parametrize('extension', ['.parquet', '.feather'])
+def test_write_binary_round_trip(tmp_path, extension):
+    data = sample_frame().drop(columns=['Kind'])
+    path = str(tmp_path / f'table{extension}')
+    write_binary([data.iloc[:200], data.iloc[200:]], path, output_format(path))
+    read = pd.read_parquet(path) if extension == '.parquet' else pd.read_feather(path)
+    pd.testing.assert_frame_equal(read, data.reset_index(drop=True))
+
+
+def test_write_binary_widens_compact_tables(tmp_path):
+    data = pd.DataFrame({'Source': ['a', 'b', 'a'], '2023': [1, 2, 3], '2024': [0.1, 2.25, 3.5]})
+    path = str(tmp_path / 'table.parquet')
+    write_binary([compact_table(data)], path, 'parquet')
+    pd.testing.assert_frame_equal(pd.read_parquet(path), data)
@@ -0,0 +1,142 @@
+"""Lightweight timing spans around the slow steps of the app.
+
+Wrap a step with the `instrumented` decorator or a `recorder.span()` block. Every span
+records its duration, the rows it handled and the change of the process memory (when
+psutil is installed). The recorder keeps the latest spans, tells listeners about new
+ones and exports them as Chrome trace JSON (chrome://tracing or https://ui.perfetto.dev).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_process = None
+
+
+class Span:
+    """One timed run of a named step."""
+
+    def __init__(self, name, start, thread_id):
+        self.name = name
+        self.start = start
+        self.thread_id = thread_id
+        self.duration = None
+        self.rows = None
+        self.memory_delta = None
+
+    def describe(self):
+        """Returns a short text like 'update_stock 0.42 s, 10000 rows, +12.0 MB'."""
+        parts = [f"{self.name} {self.duration:.2f} s"]
+        if self.rows is not None:
+            parts.append(f"{self.rows} rows")
+        if self.memory_delta is not None:
+            parts.append(f"{self.memory_delta / 1024 ** 2:+.1f} MB")
+        return ', '.join(parts)
+
+
+class Recorder:
+    """Collects the latest spans of all threads."""
+
+    def __init__(self, limit=10000):
+        self.enabled = True
+        self.spans = deque(maxlen=limit)
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, rows=None):
+        """Times the block as a span; the block may set rows on the yielded Span."""
+        if not self.enabled:
+            yield Span(name, 0, 0)
+            return
+        memory = memory_in_use()
+        span = Span(name, time.perf_counter(), threading.get_ident())
+        span.rows = rows
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            if memory is not None:
+                span.memory_delta = memory_in_use() - memory
+            with self._lock:
+                self.spans.append(span)
+                listeners = list(self.listeners)
+            for listener in listeners:
+                listener(span)
+
+    def add_listener(self, listener):
+        """Calls listener(span) whenever a span ends, on the thread that ran it."""
+        with self._lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stops calling a listener added with add_listener."""
+        with self._lock:
+            self.listeners = [known for known in self.listeners if known is not listener]
+
+    def latest(self):
+        """Returns the most recent span of every name, in the order they ended."""
+        with self._lock:
+            spans = list(self.spans)
+        latest = {}
+        for span in spans:
+            latest.pop(span.name, None)
+            latest[span.name] = span
+        return list(latest.values())
+
+    def clear(self):
+        """Forgets all recorded spans."""
+        with self._lock:
+            self.spans.clear()
+
+    def chrome_trace(self):
+        """Returns the recorded spans as a Chrome trace event dictionary."""
+        with self._lock:
+            spans = list(self.spans)
+        events = [{'name': span.name, 'cat': 'app', 'ph': 'X', 'pid': os.getpid(), 'tid': span.thread_id,
+                   'ts': (span.start - self._origin) * 1e6, 'dur': span.duration * 1e6,
+                   'args': {'rows': span.rows, 'memory_delta_bytes': span.memory_delta}}
+                  for span in spans]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, file_path):
+        """Writes the recorded spans to a Chrome trace JSON file."""
+        with open(file_path, 'w') as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+recorder = Recorder()
+
+
+def instrumented(name, rows=None):
+    """Decorator recording every call of the function as a span of the shared recorder.
+
+    rows, if given, is called with the function's result to count the rows it handled.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with recorder.span(name) as span:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    span.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def memory_in_use():
+    """Returns the resident memory of the process in bytes, or None without psutil."""
+    global _process
+    if _process is None:
+        try:
+            import psutil
+        except ImportError:
+            _process = False
+        else:
+            _process = psutil.Process()
+    return _process.memory_info().rss if _process else None
@@ -0,0 +1,70 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+
+class DataFrameModel(QAbstractTableModel):
+    """Table model reading cells straight from a DataFrame.
+
+    The view only asks for the cells it shows, so nothing is formatted up front.
+    Edits are not written by the model itself: they are reported through cellEdited
+    and the receiver updates the DataFrame.
+    """
+
+    cellEdited = pyqtSignal(int, int, object)
+
+    def __init__(self, data, editable=True, parent=None):
+        super().__init__(parent)
+        self.data_frame = data
+        self.editable = editable
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.data_frame.shape[0]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.data_frame.shape[1]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return str(self.data_frame.iat[index.row(), index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self.data_frame.columns[section])
+        return str(section + 1)
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return flags | Qt.ItemIsEditable if self.editable else flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or not self.editable:
+            return False
+        self.cellEdited.emit(index.row(), index.column(), value)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def append_row(self, values, append=None):
+        """Appends a row to the DataFrame and shows it in the attached views.
+
+        append, when given, is called with the values to add the row instead of writing it here.
+        """
+        row = self.data_frame.shape[0]
+        self.beginInsertRows(QModelIndex(), row, row)
+        if append is None:
+            self.data_frame.loc[row] = values
+        else:
+            append(values)
+        self.endInsertRows()
+
+    def set_data_frame(self, data):
+        """Shows another DataFrame, so a view keeps one model however often its table is replaced."""
+        self.beginResetModel()
+        self.data_frame = data
+        self.endResetModel()
+
+    def refresh(self):
+        """Tells the attached views that cells of the DataFrame changed in place; only visible ones are redrawn."""
+        if self.rowCount() and self.columnCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
@@ -0,0 +1,29 @@
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QLabel
+
+
+class TimingLabel(QLabel):
+    """Status bar label showing the last recorded span, with the latest one of every step as tooltip.
+
+    Spans may end on pool threads, so they reach the label through a queued Qt signal.
+    """
+
+    spanRecorded = pyqtSignal(object)
+
+    def __init__(self, recorder, parent=None):
+        super().__init__(parent)
+        self.recorder = recorder
+        self.spanRecorded.connect(self.show_span)
+        self._listener = self.forward_span
+        recorder.add_listener(self._listener)
+
+    def forward_span(self, span):
+        """Recorder listener, called on the thread that ran the span."""
+        try:
+            self.spanRecorded.emit(span)
+        except RuntimeError:  # The label was deleted together with its window
+            self.recorder.remove_listener(self._listener)
+
+    def show_span(self, span):
+        self.setText(span.describe())
+        self.setToolTip('\n'.join(latest.describe() for latest in self.recorder.latest()))
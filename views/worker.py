@@ -0,0 +1,57 @@
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it was cancelled."""
+
+
+class JobSignals(QObject):
+    progress = pyqtSignal(int, int)
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class Job(QRunnable):
+    """Runs function(job) on a QThreadPool thread and reports back through Qt signals.
+
+    Signals are delivered on the GUI thread. The function can pass job.report_progress
+    as a progress callback; once cancel() was called that callback raises JobCancelled,
+    so the work stops at its next progress step.
+    """
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+        self.signals = JobSignals()
+        self._cancel_requested = threading.Event()
+
+    def cancel(self):
+        """Asks the job to stop at its next progress step."""
+        self._cancel_requested.set()
+
+    def is_cancelled(self):
+        return self._cancel_requested.is_set()
+
+    def report_progress(self, done, total):
+        """Progress callback for the job function; raises JobCancelled after cancel()."""
+        if self.is_cancelled():
+            raise JobCancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            result = self.function(self)
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.result.emit(result)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(e)
+        finally:
+            self.signals.finished.emit()